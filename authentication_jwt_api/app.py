@@ -1,10 +1,16 @@
 from fastapi import FastAPI, HTTPException, Depends, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, EmailStr
 from typing import List, Optional
 from datetime import datetime, timedelta
 import uvicorn
+import os
+import hmac
+import json
+import base64
+import calendar
 import secrets
 import hashlib
 import jwt
@@ -22,15 +28,21 @@ app.add_middleware(
 )
 
 # Configuration
-SECRET_KEY = "your-secret-key-change-in-production"
+SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 OTP_EXPIRE_MINUTES = 5
+# users_db lives in-process, so only raise this once storage is shared
+WORKERS = int(os.getenv("WORKERS", "1"))
 
 # Security
 security = HTTPBearer()
 
+# base64url of {"alg":"HS256","typ":"JWT"} - identical for every token we issue
+_JWT_HEADER_B64 = b"eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9"
+_SECRET_KEY_BYTES = SECRET_KEY.encode()
+
 # Enums
 class UserRole(str, Enum):
     USER = "user"
@@ -87,6 +99,8 @@ class OTPResponse(BaseModel):
     otp_id: str
     expires_at: datetime
 
+USER_RESPONSE_FIELDS = tuple(UserResponse.model_fields)
+
 # In-memory database (for demo purposes)
 users_db = [
     {
@@ -100,10 +114,13 @@ users_db = [
         "is_active": True,
         "created_at": datetime.now() - timedelta(days=30),
         "last_login": datetime.now() - timedelta(hours=2),
-        "refresh_tokens": []
+        "refresh_tokens": set()
     }
 ]
 
+# Ids of users whose "is_active" flag is set; mirrors users_db for cheap auth checks
+active_user_ids = {u["id"] for u in users_db if u["is_active"]}
+
 otp_db = []
 reset_tokens_db = []
 next_user_id = 2
@@ -116,6 +133,19 @@ def hash_password(password: str) -> str:
 def verify_password(password: str, hashed_password: str) -> bool:
     return hash_password(password) == hashed_password
 
+def _b64url(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+def encode_hs256(payload: dict) -> str:
+    """Encode an HS256 JWT using the precomputed header segment"""
+    if isinstance(payload.get("exp"), datetime):
+        payload["exp"] = calendar.timegm(payload["exp"].utctimetuple())
+    signing_input = _JWT_HEADER_B64 + b"." + _b64url(
+        json.dumps(payload, separators=(",", ":")).encode()
+    )
+    signature = hmac.new(_SECRET_KEY_BYTES, signing_input, hashlib.sha256).digest()
+    return (signing_input + b"." + _b64url(signature)).decode()
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -123,14 +153,14 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encoded_jwt = encode_hs256(to_encode)
     return encoded_jwt
 
 def create_refresh_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
     to_encode.update({"exp": expire, "type": "refresh"})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encoded_jwt = encode_hs256(to_encode)
     return encoded_jwt
 
 def verify_token(token: str):
@@ -161,8 +191,11 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = next((u for u in users_db if u["id"] == int(user_id)), None)
-    if user is None or not user["is_active"]:
+    user_id = int(user_id)
+    user = None
+    if user_id in active_user_ids:
+        user = next((u for u in users_db if u["id"] == user_id), None)
+    if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found or inactive",
@@ -208,10 +241,11 @@ async def register(user: UserCreate):
         "is_active": True,
         "created_at": datetime.now(),
         "last_login": None,
-        "refresh_tokens": []
+        "refresh_tokens": set()
     }
     
     users_db.append(new_user)
+    active_user_ids.add(new_user["id"])
     next_user_id += 1
     
     # Generate and store OTP
@@ -334,7 +368,7 @@ async def login(login_data: UserLogin):
     )
     
     # Store refresh token
-    user["refresh_tokens"].append(refresh_token)
+    user["refresh_tokens"].add(refresh_token)
     
     return {
         "access_token": access_token,
@@ -402,7 +436,7 @@ async def logout(current_user: dict = Depends(get_current_user)):
     """Logout user (remove refresh token)"""
     # In a real implementation, you'd want to remove the specific refresh token
     # For demo purposes, we'll clear all refresh tokens
-    current_user["refresh_tokens"] = []
+    current_user["refresh_tokens"].clear()
     return {"message": "Logged out successfully"}
 
 # Get Current User
@@ -496,14 +530,14 @@ async def get_all_users(current_user: dict = Depends(get_current_user)):
             detail="Admin access required"
         )
     
-    users_response = []
-    for user in users_db:
-        user_copy = user.copy()
-        del user_copy["password_hash"]
-        del user_copy["refresh_tokens"]
-        users_response.append(user_copy)
+    # Rows are built internally, so skip response_model validation and
+    # serialize straight to JSON; response_model is kept for the schema
+    users_response = [
+        {field: user[field] for field in USER_RESPONSE_FIELDS}
+        for user in users_db
+    ]
     
-    return users_response
+    return ORJSONResponse(content=users_response)
 
 @app.post("/admin/deactivate-user/{user_id}")
 async def deactivate_user(
@@ -525,7 +559,15 @@ async def deactivate_user(
         )
     
     user["is_active"] = False
+    active_user_ids.discard(user_id)
     return {"message": f"User {user['username']} deactivated"}
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8002)
+    uvicorn.run(
+        "app:app",
+        host="0.0.0.0",
+        port=8002,
+        workers=WORKERS,
+        loop="uvloop",
+        http="httptools",
+    )
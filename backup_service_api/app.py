@@ -1,6 +1,6 @@
 from fastapi import FastAPI, HTTPException, UploadFile, File, BackgroundTasks
-from fastapi.responses import FileResponse, JSONResponse
-from pydantic import BaseModel, validator
+from fastapi.responses import FileResponse, JSONResponse, ORJSONResponse, Response
+from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any, Union
 from enum import Enum
 import os
@@ -8,14 +8,38 @@ import uuid
 import asyncio
 from datetime import datetime, timedelta
 import json
+import sqlite3
+import re
+import fnmatch
 import zipfile
+import tarfile
 import shutil
+import struct
+import time
+import zlib
+import multiprocessing
+import threading
+from collections import deque
+from functools import lru_cache, partial
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+import orjson
+
+try:
+    import deflate  # libdeflate bindings
+except ImportError:
+    deflate = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 app = FastAPI(
     title="Backup Service API",
     description="Comprehensive backup service for data protection, recovery, and archival",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Enums
@@ -42,31 +66,32 @@ class StorageType(str, Enum):
     SFTP = "sftp"
 
 class CompressionType(str, Enum):
-    NONE = "none"
+    NONE = "none"  # ZIP archive with stored (uncompressed) entries
     ZIP = "zip"
-    TAR_GZ = "tar.gz"
-    TAR_BZ2 = "tar.bz2"
-    SEVEN_ZIP = "7z"
+    ZSTD = "zstd"
 
 class EncryptionType(str, Enum):
     NONE = "none"
     AES256 = "aes256"
     RSA = "rsa"
 
+# New jobs use zstd when the zstandard package is installed
+DEFAULT_COMPRESSION = CompressionType.ZSTD if zstandard is not None else CompressionType.ZIP
+
 # Data Models
 class BackupRequest(BaseModel):
     name: str
     source_paths: List[str]
     backup_type: BackupType = BackupType.FULL
     storage_type: StorageType = StorageType.LOCAL
-    compression: CompressionType = CompressionType.ZIP
+    compression: CompressionType = DEFAULT_COMPRESSION
     encryption: EncryptionType = EncryptionType.NONE
     encryption_key: Optional[str] = None
     schedule: Optional[str] = None  # Cron expression
     retention_days: int = 30
-    exclude_patterns: Optional[List[str]] = []
-    include_patterns: Optional[List[str]] = []
-    metadata: Optional[Dict[str, Any]] = {}
+    exclude_patterns: Optional[List[str]] = Field(default_factory=list)
+    include_patterns: Optional[List[str]] = Field(default_factory=list)
+    metadata: Optional[Dict[str, Any]] = Field(default_factory=dict)
 
 class BackupJob(BaseModel):
     id: Optional[str] = None
@@ -89,7 +114,7 @@ class BackupJob(BaseModel):
     backup_size: int = 0
     error_message: Optional[str] = None
     retention_days: int = 30
-    metadata: Optional[Dict[str, Any]] = {}
+    metadata: Optional[Dict[str, Any]] = Field(default_factory=dict)
 
 class RestoreRequest(BaseModel):
     backup_id: str
@@ -109,9 +134,12 @@ class BackupSchedule(BaseModel):
     next_run: Optional[datetime] = None
     created_at: Optional[datetime] = None
 
-# Storage (in production, use database)
+# Storage: jobs and schedules live in SQLite (WAL mode) so every uvicorn worker
+# shares them; jobs running in this worker are also kept in memory for progress updates
+BACKUP_DB_PATH = os.getenv("BACKUP_DB_PATH", "./backup.db")
+BACKUP_DIR = Path(os.getenv("BACKUP_STORAGE_PATH", "./backups"))
+BACKUP_DIR.mkdir(parents=True, exist_ok=True)
 backup_jobs = {}
-backup_schedules = {}
 backup_storage = {}
 restore_jobs = {}
 backup_stats = {
@@ -122,13 +150,110 @@ backup_stats = {
     "average_backup_time": 0.0
 }
 
+def init_database(db_path: str) -> sqlite3.Connection:
+    """Open the job database and create its tables and indices"""
+    conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS backups (
+            id TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            backup_type TEXT NOT NULL,
+            storage_type TEXT NOT NULL,
+            backup_size INTEGER NOT NULL DEFAULT 0,
+            data BLOB NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_backups_status ON backups (status);
+        CREATE INDEX IF NOT EXISTS idx_backups_backup_type ON backups (backup_type);
+        CREATE TABLE IF NOT EXISTS restores (
+            id TEXT PRIMARY KEY,
+            data BLOB NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS schedules (
+            id TEXT PRIMARY KEY,
+            is_active INTEGER NOT NULL,
+            data BLOB NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_schedules_is_active ON schedules (is_active);
+    """)
+    return conn
+
+db = init_database(BACKUP_DB_PATH)
+
+# Memoized /api/storage/stats payload, dropped on every job or schedule mutation
+STATS_CACHE_TTL = 5.0
+_stats_cache = {"ts": 0.0, "value": None}
+
+def _invalidate_stats():
+    _stats_cache["ts"] = 0.0
+
+# Rendered /api/backup pages keyed by query; cleared on writes from this worker and
+# whenever PRAGMA data_version shows another connection has committed
+BACKUP_PAGE_CACHE_SIZE = 256
+_backup_pages = {"data_version": None, "pages": {}}
+
+def _cached_backup_page(key) -> Optional[bytes]:
+    data_version = db.execute("PRAGMA data_version").fetchone()[0]
+    if data_version != _backup_pages["data_version"]:
+        _backup_pages["data_version"] = data_version
+        _backup_pages["pages"].clear()
+    return _backup_pages["pages"].get(key)
+
+def _store_backup_page(key, page: bytes):
+    pages = _backup_pages["pages"]
+    if len(pages) >= BACKUP_PAGE_CACHE_SIZE:
+        pages.clear()
+    pages[key] = page
+
+def _backups_changed():
+    _invalidate_stats()
+    _backup_pages["pages"].clear()
+
+def save_backup_job(backup_job: dict):
+    """Insert or update a backup job row; rowid (listing order) is preserved on update"""
+    db.execute(
+        "INSERT INTO backups (id, status, backup_type, storage_type, backup_size, data) "
+        "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(id) DO UPDATE SET "
+        "status = excluded.status, backup_size = excluded.backup_size, data = excluded.data",
+        (backup_job["id"], backup_job["status"], backup_job["backup_type"],
+         backup_job["storage_type"], backup_job["backup_size"], orjson.dumps(backup_job))
+    )
+    _backups_changed()
+
+def get_backup_job(backup_id: str) -> Optional[dict]:
+    """Live in-memory job if it runs in this worker, else the stored record"""
+    backup_job = backup_jobs.get(backup_id)
+    if backup_job is not None:
+        return backup_job
+    row = db.execute("SELECT data FROM backups WHERE id = ?", (backup_id,)).fetchone()
+    return orjson.loads(row[0]) if row else None
+
+def save_restore_job(restore_job: dict):
+    db.execute(
+        "INSERT OR REPLACE INTO restores (id, data) VALUES (?, ?)",
+        (restore_job["id"], orjson.dumps(restore_job))
+    )
+
+def get_restore_job(restore_id: str) -> Optional[dict]:
+    restore_job = restore_jobs.get(restore_id)
+    if restore_job is not None:
+        return restore_job
+    row = db.execute("SELECT data FROM restores WHERE id = ?", (restore_id,)).fetchone()
+    return orjson.loads(row[0]) if row else None
+
 @app.get("/")
 async def root():
     return {"message": "Backup Service API", "version": "1.0.0", "status": "running"}
 
+@lru_cache(maxsize=1)
+def _isoformat_second(second: int) -> str:
+    return datetime.fromtimestamp(second).isoformat()
+
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "timestamp": datetime.now().isoformat()}
+    # Repeated polls within the same second reuse the formatted timestamp
+    return {"status": "healthy", "timestamp": _isoformat_second(int(time.time()))}
 
 # Backup Operations
 @app.post("/api/backup/create")
@@ -142,8 +267,11 @@ async def create_backup(request: BackupRequest, background_tasks: BackgroundTask
             if not os.path.exists(path):
                 raise HTTPException(status_code=400, detail=f"Source path does not exist: {path}")
         
-        # Create backup job
-        backup_job = BackupJob(
+        if request.compression == CompressionType.ZSTD and zstandard is None:
+            raise HTTPException(status_code=400, detail="zstd compression requires the zstandard package")
+        
+        # Create backup job; fields come from the validated request, so skip re-validation
+        backup_job = BackupJob.model_construct(
             id=backup_id,
             name=request.name,
             source_paths=request.source_paths,
@@ -157,7 +285,9 @@ async def create_backup(request: BackupRequest, background_tasks: BackgroundTask
             metadata=request.metadata
         )
         
+        backup_job = backup_job.model_dump()
         backup_jobs[backup_id] = backup_job
+        save_backup_job(backup_job)
         
         # Start backup in background
         background_tasks.add_task(execute_backup, backup_id, request)
@@ -166,7 +296,7 @@ async def create_backup(request: BackupRequest, background_tasks: BackgroundTask
             "success": True,
             "backup_id": backup_id,
             "message": "Backup job created successfully",
-            "backup_job": backup_job.dict()
+            "backup_job": backup_job
         }
         
     except HTTPException:
@@ -177,13 +307,19 @@ async def create_backup(request: BackupRequest, background_tasks: BackgroundTask
 @app.get("/api/backup/{backup_id}")
 async def get_backup(backup_id: str):
     """Get backup job details"""
-    if backup_id not in backup_jobs:
+    backup_job = backup_jobs.get(backup_id)
+    if backup_job is not None:
+        return {
+            "success": True,
+            "backup": backup_job
+        }
+    
+    row = db.execute("SELECT data FROM backups WHERE id = ?", (backup_id,)).fetchone()
+    if row is None:
         raise HTTPException(status_code=404, detail="Backup not found")
     
-    return {
-        "success": True,
-        "backup": backup_jobs[backup_id]
-    }
+    # Stored records are already JSON; splice them in instead of decoding and re-encoding
+    return Response(b'{"success":true,"backup":' + row[0] + b"}", media_type="application/json")
 
 @app.get("/api/backup")
 async def list_backups(
@@ -194,25 +330,39 @@ async def list_backups(
 ):
     """List backup jobs"""
     try:
-        filtered_backups = list(backup_jobs.values())
+        page_key = (status, backup_type, limit, offset)
+        page = _cached_backup_page(page_key)
+        if page is not None:
+            return Response(page, media_type="application/json")
         
-        # Apply filters
+        # Apply filters via the status/backup_type indices
+        conditions, params = [], []
         if status:
-            filtered_backups = [b for b in filtered_backups if b.get("status") == status]
+            conditions.append("status = ?")
+            params.append(status)
         if backup_type:
-            filtered_backups = [b for b in filtered_backups if b.get("backup_type") == backup_type]
+            conditions.append("backup_type = ?")
+            params.append(backup_type)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
         
-        # Apply pagination
-        total = len(filtered_backups)
-        paginated_backups = filtered_backups[offset:offset + limit]
+        # Apply pagination; jobs running in this worker report live progress
+        total = db.execute(f"SELECT COUNT(*) FROM backups{where}", params).fetchone()[0]
+        rows = db.execute(
+            f"SELECT id, data FROM backups{where} ORDER BY rowid LIMIT ? OFFSET ?",
+            (*params, limit, offset)
+        )
+        paginated_backups = [
+            orjson.dumps(backup_jobs[job_id]) if job_id in backup_jobs else data
+            for job_id, data in rows
+        ]
         
-        return {
-            "success": True,
-            "total": total,
-            "limit": limit,
-            "offset": offset,
-            "backups": paginated_backups
-        }
+        # Render once from the stored JSON records and keep the bytes for repeat polls
+        page = b"".join((
+            orjson.dumps({"success": True, "total": total, "limit": limit, "offset": offset})[:-1],
+            b',"backups":[', b",".join(paginated_backups), b"]}"
+        ))
+        _store_backup_page(page_key, page)
+        return Response(page, media_type="application/json")
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to list backups: {str(e)}")
@@ -221,17 +371,18 @@ async def list_backups(
 async def delete_backup(backup_id: str):
     """Delete a backup job and its files"""
     try:
-        if backup_id not in backup_jobs:
+        backup_job = get_backup_job(backup_id)
+        if backup_job is None:
             raise HTTPException(status_code=404, detail="Backup not found")
         
-        backup_job = backup_jobs[backup_id]
-        
         # Delete backup file if exists
         if backup_job.get("backup_file_path") and os.path.exists(backup_job["backup_file_path"]):
             os.remove(backup_job["backup_file_path"])
         
         # Remove from storage
-        del backup_jobs[backup_id]
+        db.execute("DELETE FROM backups WHERE id = ?", (backup_id,))
+        backup_jobs.pop(backup_id, None)
+        _backups_changed()
         
         return {
             "success": True,
@@ -248,7 +399,7 @@ async def delete_backup(backup_id: str):
 async def create_restore(request: RestoreRequest, background_tasks: BackgroundTasks):
     """Create a restore job"""
     try:
-        if request.backup_id not in backup_jobs:
+        if get_backup_job(request.backup_id) is None:
             raise HTTPException(status_code=404, detail="Backup not found")
         
         restore_id = str(uuid.uuid4())
@@ -273,6 +424,7 @@ async def create_restore(request: RestoreRequest, background_tasks: BackgroundTa
         }
         
         restore_jobs[restore_id] = restore_job
+        save_restore_job(restore_job)
         
         # Start restore in background
         background_tasks.add_task(execute_restore, restore_id, request)
@@ -292,12 +444,13 @@ async def create_restore(request: RestoreRequest, background_tasks: BackgroundTa
 @app.get("/api/restore/{restore_id}")
 async def get_restore(restore_id: str):
     """Get restore job details"""
-    if restore_id not in restore_jobs:
+    restore_job = get_restore_job(restore_id)
+    if restore_job is None:
         raise HTTPException(status_code=404, detail="Restore job not found")
     
     return {
         "success": True,
-        "restore": restore_jobs[restore_id]
+        "restore": restore_job
     }
 
 # Schedule Operations
@@ -307,14 +460,18 @@ async def create_schedule(schedule: BackupSchedule):
     try:
         schedule_id = str(uuid.uuid4())
         
-        schedule_record = schedule.dict()
+        schedule_record = schedule.model_dump()
         schedule_record["id"] = schedule_id
         schedule_record["created_at"] = datetime.now()
         
         # Calculate next run time (simplified)
         schedule_record["next_run"] = datetime.now() + timedelta(hours=24)  # Daily for demo
         
-        backup_schedules[schedule_id] = schedule_record
+        db.execute(
+            "INSERT INTO schedules (id, is_active, data) VALUES (?, ?, ?)",
+            (schedule_id, schedule_record["is_active"], orjson.dumps(schedule_record))
+        )
+        _invalidate_stats()
         
         return {
             "success": True,
@@ -334,13 +491,14 @@ async def list_schedules(
 ):
     """List backup schedules"""
     try:
-        filtered_schedules = list(backup_schedules.values())
-        
-        if is_active is not None:
-            filtered_schedules = [s for s in filtered_schedules if s.get("is_active") == is_active]
+        where, params = (" WHERE is_active = ?", [is_active]) if is_active is not None else ("", [])
         
-        total = len(filtered_schedules)
-        paginated_schedules = filtered_schedules[offset:offset + limit]
+        total = db.execute(f"SELECT COUNT(*) FROM schedules{where}", params).fetchone()[0]
+        rows = db.execute(
+            f"SELECT data FROM schedules{where} ORDER BY rowid LIMIT ? OFFSET ?",
+            (*params, limit, offset)
+        )
+        paginated_schedules = [orjson.loads(data) for (data,) in rows]
         
         return {
             "success": True,
@@ -358,71 +516,87 @@ async def list_schedules(
 async def get_storage_stats():
     """Get storage statistics"""
     try:
-        # Calculate storage usage
-        total_storage = 0
-        backup_count = 0
+        now = time.monotonic()
+        if _stats_cache["value"] is not None and now - _stats_cache["ts"] < STATS_CACHE_TTL:
+            return _stats_cache["value"]
         
-        for backup in backup_jobs.values():
-            if backup.get("backup_size"):
-                total_storage += backup["backup_size"]
-                backup_count += 1
+        # Aggregate per bucket in SQL instead of loading every job
+        status_counts = dict(db.execute("SELECT status, COUNT(*) FROM backups GROUP BY status"))
+        storage_types = {
+            storage_type: {"count": count, "size": size}
+            for storage_type, count, size in db.execute(
+                "SELECT storage_type, COUNT(*), SUM(backup_size) FROM backups GROUP BY storage_type"
+            )
+        }
+        total_storage, backup_count = db.execute(
+            "SELECT COALESCE(SUM(backup_size), 0), COUNT(*) FROM backups WHERE backup_size > 0"
+        ).fetchone()
         
         stats = {
-            "total_backups": len(backup_jobs),
-            "completed_backups": len([b for b in backup_jobs.values() if b.get("status") == BackupStatus.COMPLETED]),
-            "failed_backups": len([b for b in backup_jobs.values() if b.get("status") == BackupStatus.FAILED]),
+            "total_backups": sum(status_counts.values()),
+            "completed_backups": status_counts.get(BackupStatus.COMPLETED.value, 0),
+            "failed_backups": status_counts.get(BackupStatus.FAILED.value, 0),
             "total_storage_used": total_storage,
             "average_backup_size": total_storage / backup_count if backup_count > 0 else 0,
-            "active_schedules": len([s for s in backup_schedules.values() if s.get("is_active")]),
-            "storage_types": {},
-            "backup_types": {}
+            "active_schedules": db.execute(
+                "SELECT COUNT(*) FROM schedules WHERE is_active = 1"
+            ).fetchone()[0],
+            "storage_types": storage_types,
+            "backup_types": dict(
+                db.execute("SELECT backup_type, COUNT(*) FROM backups GROUP BY backup_type")
+            )
         }
         
-        # Storage types breakdown
-        for backup in backup_jobs.values():
-            storage_type = backup.get("storage_type", "unknown")
-            if storage_type not in stats["storage_types"]:
-                stats["storage_types"][storage_type] = {"count": 0, "size": 0}
-            stats["storage_types"][storage_type]["count"] += 1
-            if backup.get("backup_size"):
-                stats["storage_types"][storage_type]["size"] += backup["backup_size"]
-        
-        # Backup types breakdown
-        for backup in backup_jobs.values():
-            backup_type = backup.get("backup_type", "unknown")
-            if backup_type not in stats["backup_types"]:
-                stats["backup_types"][backup_type] = 0
-            stats["backup_types"][backup_type] += 1
-        
-        return {
+        response = {
             "success": True,
             "statistics": stats
         }
+        _stats_cache["ts"], _stats_cache["value"] = now, response
+        return response
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get storage stats: {str(e)}")
 
+class BackupFileResponse(FileResponse):
+    """FileResponse reading archives in 1 MiB chunks instead of 64 KiB"""
+    chunk_size = 1024 * 1024
+
 @app.get("/api/backup/{backup_id}/download")
 async def download_backup(backup_id: str):
     """Download backup file"""
     try:
-        if backup_id not in backup_jobs:
+        backup_job = get_backup_job(backup_id)
+        if backup_job is None:
             raise HTTPException(status_code=404, detail="Backup not found")
         
-        backup_job = backup_jobs[backup_id]
-        
         if backup_job.get("status") != BackupStatus.COMPLETED:
             raise HTTPException(status_code=400, detail="Backup not completed")
         
         backup_file_path = backup_job.get("backup_file_path")
         
-        if not backup_file_path or not os.path.exists(backup_file_path):
+        # One stat serves the existence check, the headers and FileResponse itself
+        try:
+            st = os.stat(backup_file_path) if backup_file_path else None
+        except OSError:
+            st = None
+        if st is None:
             raise HTTPException(status_code=404, detail="Backup file not found")
         
-        return FileResponse(
+        if backup_job.get("compression") == CompressionType.ZSTD:
+            filename, media_type = f"{backup_job['name']}.tar.zst", "application/zstd"
+        else:
+            filename, media_type = f"{backup_job['name']}.zip", "application/zip"
+        
+        return BackupFileResponse(
             path=backup_file_path,
-            filename=f"{backup_job['name']}.zip",
-            media_type="application/zip"
+            filename=filename,
+            media_type=media_type,
+            stat_result=st,
+            headers={
+                "Content-Length": str(st.st_size),
+                "ETag": f'"{st.st_size}-{st.st_mtime_ns}"',
+                "Accept-Ranges": "none"
+            }
         )
         
     except HTTPException:
@@ -430,6 +604,448 @@ async def download_backup(backup_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to download backup: {str(e)}")
 
+# Archive helpers
+ZIP_CHUNK_SIZE = 1024 * 1024
+DEFLATE_LEVEL = int(os.getenv("COMPRESSION_LEVEL", "1"))
+ZIP_METHOD_STORED = 0
+ZIP_METHOD_DEFLATED = 8
+ZIP64_LIMIT = 0xFFFFFFFF
+ZIP_UTF8_FLAG = 0x800
+# Pending-write limits for ZipArchiveWriter (~64 entries of header, name, payload)
+ZIP_WRITEV_BUFFERS = 192
+ZIP_WRITEV_BYTES = 1024 * 1024
+# Files above this size are streamed into the archive instead of read whole
+ZIP_STREAM_THRESHOLD = 64 * 1024 * 1024
+# Already-compressed formats are stored as-is; deflating them wastes CPU
+INCOMPRESSIBLE_EXTENSIONS = frozenset({
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".mp3", ".mp4", ".mkv", ".mov",
+    ".zip", ".gz", ".tgz", ".bz2", ".xz", ".zst", ".7z", ".rar",
+})
+
+def deflate_bytes(data: bytes, level: int = DEFLATE_LEVEL) -> bytes:
+    """Raw DEFLATE stream (no zlib wrapper), as stored in ZIP entries"""
+    if deflate is not None:
+        return bytes(deflate.deflate_compress(data, level))
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush()
+
+def crc32(data: bytes, value: int = 0) -> int:
+    """CRC32 of data (continuing from value), using libdeflate's PCLMULQDQ path when available"""
+    if deflate is not None:
+        return deflate.crc32(data, value)
+    return zlib.crc32(data, value)
+
+def entry_method(file_path: str, store_only: bool = False) -> int:
+    """ZIP method for a file: stored for incompressible formats, else deflated"""
+    if store_only or os.path.splitext(file_path)[1].lower() in INCOMPRESSIBLE_EXTENSIONS:
+        return ZIP_METHOD_STORED
+    return ZIP_METHOD_DEFLATED
+
+def compress_file(file_path: str, method: int = ZIP_METHOD_DEFLATED):
+    """Read and compress a file; returns (crc, raw_size, payload, method).
+
+    Module-level so it can run in a ProcessPoolExecutor worker.
+    """
+    with open(file_path, "rb") as src:
+        chunks = []
+        while True:
+            chunk = src.read(ZIP_CHUNK_SIZE)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    raw = b"".join(chunks)
+    payload = raw if method == ZIP_METHOD_STORED else deflate_bytes(raw)
+    return crc32(raw), len(raw), payload, method
+
+class _ZipEntrySink:
+    """Write-only file object that (optionally) deflates into an open ZipArchiveWriter"""
+
+    def __init__(self, archive: "ZipArchiveWriter", method: int = ZIP_METHOD_DEFLATED):
+        self.archive = archive
+        self.compressor = None
+        if method == ZIP_METHOD_DEFLATED:
+            self.compressor = zlib.compressobj(DEFLATE_LEVEL, zlib.DEFLATED, -15)
+        self.crc = 0
+        self.raw_size = 0
+        self.comp_size = 0
+
+    def _emit(self, data: bytes):
+        if data:
+            self.archive._write(data)
+            self.comp_size += len(data)
+
+    def write(self, data: bytes) -> int:
+        self.crc = crc32(data, self.crc)
+        self.raw_size += len(data)
+        self._emit(self.compressor.compress(data) if self.compressor else data)
+        return len(data)
+
+    def finish(self):
+        if self.compressor:
+            self._emit(self.compressor.flush())
+
+def _dos_datetime(timestamp: float):
+    t = time.localtime(timestamp)
+    dos_time = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+    dos_date = (max(t.tm_year, 1980) - 1980) << 9 | (t.tm_mon << 5) | t.tm_mday
+    return dos_time, dos_date
+
+class ZipArchiveWriter:
+    """Minimal ZIP container writer for entries compressed outside zipfile.
+
+    Entries are compressed up front (libdeflate when installed, zlib otherwise)
+    and appended as local header + payload; the central directory is written
+    on close. The output is readable by the stdlib zipfile module.
+
+    Headers and payloads are queued and flushed with one os.writev() per
+    ZIP_WRITEV_BUFFERS pieces or ZIP_WRITEV_BYTES, so archives of many tiny
+    files don't pay a syscall per header.
+    """
+
+    def __init__(self, path):
+        self.fp = open(path, "wb", buffering=0)
+        self.offset = 0
+        self.entries = []
+        self.pending = []
+        self.pending_bytes = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _write(self, data: bytes):
+        if not data:
+            return
+        self.pending.append(data)
+        self.pending_bytes += len(data)
+        self.offset += len(data)
+        if len(self.pending) >= ZIP_WRITEV_BUFFERS or self.pending_bytes >= ZIP_WRITEV_BYTES:
+            self._flush()
+
+    def _flush(self):
+        """Write queued buffers in one gather syscall, finishing any short write"""
+        if not self.pending:
+            return
+        fd = self.fp.fileno()
+        written = os.writev(fd, self.pending) if hasattr(os, "writev") else 0
+        if written < self.pending_bytes:
+            rest = memoryview(b"".join(self.pending))[written:]
+            while rest:
+                rest = rest[os.write(fd, rest):]
+        self.pending = []
+        self.pending_bytes = 0
+
+    def add_entry(self, arcname: str, crc: int, raw_size: int, payload: bytes,
+                  method: int = ZIP_METHOD_DEFLATED, mtime: Optional[float] = None,
+                  mode: int = 0o100644):
+        """Append an already-compressed entry to the archive"""
+        name = arcname.replace(os.sep, "/").encode("utf-8")
+        dos_time, dos_date = _dos_datetime(time.time() if mtime is None else mtime)
+        comp_size = len(payload)
+        header_offset = self.offset
+
+        self._write_local_header(name, method, dos_time, dos_date, crc, comp_size, raw_size,
+                                 force_zip64=raw_size >= ZIP64_LIMIT or comp_size >= ZIP64_LIMIT)
+        self._write(payload)
+
+        self.entries.append(
+            (name, crc, comp_size, raw_size, method, dos_time, dos_date, header_offset, mode)
+        )
+
+    def _write_local_header(self, name: bytes, method: int, dos_time: int, dos_date: int,
+                            crc: int, comp_size: int, raw_size: int, force_zip64: bool = False):
+        extra = b""
+        version = 20
+        if force_zip64:
+            extra = struct.pack("<HHQQ", 0x0001, 16, raw_size, comp_size)
+            version = 45
+
+        self._write(struct.pack(
+            "<IHHHHHIIIHH", 0x04034B50, version, ZIP_UTF8_FLAG, method,
+            dos_time, dos_date, crc,
+            ZIP64_LIMIT if force_zip64 else comp_size,
+            ZIP64_LIMIT if force_zip64 else raw_size,
+            len(name), len(extra),
+        ))
+        self._write(name)
+        self._write(extra)
+
+    def write_stream(self, file_path: str, arcname: str, st: os.stat_result,
+                     method: int = ZIP_METHOD_DEFLATED):
+        """Stream a large file through an entry sink in ZIP_CHUNK_SIZE pieces.
+
+        The local header is written with a ZIP64 placeholder and patched with
+        the real CRC and sizes once the body is written.
+        """
+        name = arcname.replace(os.sep, "/").encode("utf-8")
+        dos_time, dos_date = _dos_datetime(st.st_mtime)
+        # Flush earlier entries so only this entry's bytes can be pending on failure
+        self._flush()
+        header_offset = self.offset
+        self._write_local_header(name, method, dos_time, dos_date, 0, 0, 0,
+                                 force_zip64=True)
+
+        sink = _ZipEntrySink(self, method)
+        try:
+            with open(file_path, "rb") as src:
+                shutil.copyfileobj(src, sink, ZIP_CHUNK_SIZE)
+            sink.finish()
+        except OSError:
+            # Drop the partial entry so the archive stays consistent
+            self.pending = []
+            self.pending_bytes = 0
+            self.fp.seek(header_offset)
+            self.fp.truncate()
+            self.offset = header_offset
+            raise
+
+        self._flush()
+        end_offset = self.offset
+        self.fp.seek(header_offset + 14)
+        self.fp.write(struct.pack("<I", sink.crc))
+        self.fp.seek(header_offset + 30 + len(name) + 4)
+        self.fp.write(struct.pack("<QQ", sink.raw_size, sink.comp_size))
+        self.fp.seek(end_offset)
+
+        self.entries.append(
+            (name, sink.crc, sink.comp_size, sink.raw_size, method,
+             dos_time, dos_date, header_offset, st.st_mode)
+        )
+        return sink.raw_size
+
+    def write_file(self, file_path: str, arcname: str, st: os.stat_result):
+        """Read, compress and append a file from disk"""
+        self.add_compressed(arcname, compress_file(file_path, entry_method(file_path)), st)
+
+    def add_compressed(self, arcname: str, compressed, st: os.stat_result):
+        """Append the result of compress_file(); st comes from enumeration"""
+        crc, raw_size, payload, method = compressed
+        self.add_entry(arcname, crc, raw_size, payload, method=method,
+                       mtime=st.st_mtime, mode=st.st_mode)
+
+    def close(self):
+        if self.fp is None:
+            return
+        cd_offset = self.offset
+        for name, crc, comp_size, raw_size, method, dos_time, dos_date, header_offset, mode in self.entries:
+            zip64_fields = []
+            if raw_size >= ZIP64_LIMIT:
+                zip64_fields.append(raw_size)
+            if comp_size >= ZIP64_LIMIT:
+                zip64_fields.append(comp_size)
+            if header_offset >= ZIP64_LIMIT:
+                zip64_fields.append(header_offset)
+            extra = b""
+            version = 20
+            if zip64_fields:
+                extra = struct.pack("<HH" + "Q" * len(zip64_fields), 0x0001,
+                                    8 * len(zip64_fields), *zip64_fields)
+                version = 45
+            self._write(struct.pack(
+                "<IHHHHHHIIIHHHHHII", 0x02014B50, (3 << 8) | version, version,
+                ZIP_UTF8_FLAG, method, dos_time, dos_date, crc,
+                min(comp_size, ZIP64_LIMIT), min(raw_size, ZIP64_LIMIT),
+                len(name), len(extra), 0, 0, 0, (mode & 0xFFFF) << 16,
+                min(header_offset, ZIP64_LIMIT),
+            ))
+            self._write(name)
+            self._write(extra)
+        cd_size = self.offset - cd_offset
+        count = len(self.entries)
+
+        if count >= 0xFFFF or cd_offset >= ZIP64_LIMIT or cd_size >= ZIP64_LIMIT:
+            zip64_eocd_offset = self.offset
+            self._write(struct.pack(
+                "<IQHHIIQQQQ", 0x06064B50, 44, (3 << 8) | 45, 45, 0, 0,
+                count, count, cd_size, cd_offset,
+            ))
+            self._write(struct.pack("<IIQI", 0x07064B50, 0, zip64_eocd_offset, 1))
+
+        self._write(struct.pack(
+            "<IHHHHIIH", 0x06054B50, 0, 0, min(count, 0xFFFF), min(count, 0xFFFF),
+            min(cd_size, ZIP64_LIMIT), min(cd_offset, ZIP64_LIMIT), 0,
+        ))
+        self._flush()
+        self.fp.close()
+        self.fp = None
+
+PROGRESS_BATCH_FILES = 256
+
+def progress_interval(total_files: int) -> int:
+    """Files between progress reports: every 1% of the job, at most every 256 files"""
+    return max(1, min(PROGRESS_BATCH_FILES, total_files // 100))
+PARALLEL_PROCESSING = os.getenv("PARALLEL_PROCESSING", "true").lower() == "true"
+MAX_WORKER_THREADS = int(os.getenv("MAX_WORKER_THREADS", str(os.cpu_count() or 1)))
+
+# Workers start from a clean forkserver (spawn where unavailable) rather than a fork
+# of this threaded process, and are shared by all jobs for the life of the app
+_compress_pool: Optional[ProcessPoolExecutor] = None
+_compress_pool_lock = threading.Lock()
+
+def get_compress_pool() -> ProcessPoolExecutor:
+    """Return the shared compression process pool, creating it on first use"""
+    global _compress_pool
+    with _compress_pool_lock:
+        if _compress_pool is None:
+            start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _compress_pool = ProcessPoolExecutor(
+                max_workers=MAX_WORKER_THREADS,
+                mp_context=multiprocessing.get_context(start_method)
+            )
+        return _compress_pool
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the compression process pool"""
+    with _compress_pool_lock:
+        if _compress_pool is not None:
+            _compress_pool.shutdown(cancel_futures=True)
+
+STREAM_ENTRY = "stream"
+
+def _try_compress_file(item):
+    file_path, size, method = item
+    if size > ZIP_STREAM_THRESHOLD:
+        # Large files are streamed by the writer rather than shipped whole
+        return STREAM_ENTRY
+    try:
+        return compress_file(file_path, method)
+    except OSError:
+        return None
+
+def _bounded_map(executor, fn, items, window: int):
+    """Ordered executor.map that keeps at most `window` results in flight.
+
+    Closing the generator early cancels the results still queued.
+    """
+    pending = deque()
+    try:
+        for item in items:
+            pending.append(executor.submit(fn, item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+def _zip_sync(backup_files, out_path, progress_cb, store_only: bool = False):
+    """Write backup_files into a ZIP archive; blocking, meant for a worker thread.
+
+    Files are deflated in a process pool and appended in order by this
+    single writer, so compression scales with cores.
+    """
+    files_processed = 0
+    bytes_processed = 0
+    report_every = progress_interval(len(backup_files))
+    file_items = (
+        (file_path, st.st_size, entry_method(file_path, store_only))
+        for file_path, _, st in backup_files
+    )
+    parallel = PARALLEL_PROCESSING and MAX_WORKER_THREADS > 1 and len(backup_files) > 1
+    
+    if parallel:
+        results = _bounded_map(get_compress_pool(), _try_compress_file, file_items, MAX_WORKER_THREADS * 4)
+    else:
+        results = map(_try_compress_file, file_items)
+    
+    try:
+        with ZipArchiveWriter(out_path) as archive:
+            for (file_path, arcname, st), compressed in zip(backup_files, results):
+                if compressed is None:
+                    continue
+                if compressed == STREAM_ENTRY:
+                    try:
+                        archive.write_stream(file_path, arcname, st, entry_method(file_path, store_only))
+                    except OSError:
+                        continue
+                else:
+                    archive.add_compressed(arcname, compressed, st)
+                
+                files_processed += 1
+                bytes_processed += st.st_size
+                if files_processed % report_every == 0:
+                    progress_cb(files_processed, bytes_processed)
+    finally:
+        if parallel:
+            # Drop this job's queued work; the pool itself is shared
+            results.close()
+    
+    return files_processed, bytes_processed
+
+ZSTD_LEVEL = 3
+
+def _tar_zstd_sync(backup_files, out_path, progress_cb):
+    """Write backup_files as a zstd-compressed tar stream; blocking.
+
+    threads=-1 lets libzstd compress on all cores internally.
+    """
+    files_processed = 0
+    bytes_processed = 0
+    report_every = progress_interval(len(backup_files))
+    compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL, threads=-1)
+    
+    with open(out_path, "wb") as fp, compressor.stream_writer(fp) as writer, \
+            tarfile.open(fileobj=writer, mode="w|") as tar:
+        for file_path, arcname, st in backup_files:
+            # Build the header from the enumeration stat instead of re-stating
+            info = tarfile.TarInfo(arcname)
+            info.size = st.st_size
+            info.mtime = st.st_mtime
+            info.mode = st.st_mode & 0o7777
+            try:
+                src = open(file_path, "rb")
+            except OSError:
+                continue
+            # A failure mid-entry leaves a partial member in the stream, which
+            # cannot be rewound, so it fails the whole archive
+            with src:
+                tar.addfile(info, src)
+            
+            files_processed += 1
+            bytes_processed += st.st_size
+            if files_processed % report_every == 0:
+                progress_cb(files_processed, bytes_processed)
+    
+    return files_processed, bytes_processed
+
+def _untar_zstd_sync(archive_path, restore_path, progress_cb, report_every: int = PROGRESS_BATCH_FILES):
+    """Extract a .tar.zst backup; blocking, meant for a worker thread"""
+    files_restored = 0
+    
+    with open(archive_path, "rb") as fp, zstandard.ZstdDecompressor().stream_reader(fp) as reader, \
+            tarfile.open(fileobj=reader, mode="r|") as tar:
+        tar.extraction_filter = getattr(tarfile, "data_filter", None)
+        for member in tar:
+            try:
+                tar.extract(member, restore_path)
+            except Exception as e:
+                # Log error but continue
+                print(f"Error restoring {member.name}: {e}")
+                continue
+            
+            files_restored += 1
+            if files_restored % report_every == 0:
+                progress_cb(files_restored)
+    
+    return files_restored
+
+def update_restore_progress(restore_job: dict, files_restored: int):
+    total_files = restore_job["total_files"]
+    restore_job["progress"] = min(files_restored / total_files * 100, 100.0) if total_files > 0 else 0
+    restore_job["files_restored"] = files_restored
+    save_restore_job(restore_job)
+
+def update_backup_progress(backup_job: dict, files_processed: int, bytes_processed: int):
+    total_files = backup_job["total_files"]
+    backup_job["progress"] = (files_processed / total_files) * 100 if total_files > 0 else 0
+    backup_job["files_processed"] = files_processed
+    backup_job["bytes_processed"] = bytes_processed
+    save_backup_job(backup_job)
+
 # Background Tasks
 async def execute_backup(backup_id: str, request: BackupRequest):
     """Execute backup job in background"""
@@ -437,61 +1053,50 @@ async def execute_backup(backup_id: str, request: BackupRequest):
         backup_job = backup_jobs[backup_id]
         backup_job["status"] = BackupStatus.RUNNING
         backup_job["started_at"] = datetime.now()
+        save_backup_job(backup_job)
+        started = time.perf_counter()
         
-        # Create backup directory
-        backup_dir = Path("./backups")
-        backup_dir.mkdir(exist_ok=True)
+        if request.compression == CompressionType.ZSTD:
+            archive_ext, write_archive = ".tar.zst", _tar_zstd_sync
+        elif request.compression == CompressionType.NONE:
+            archive_ext, write_archive = ".zip", partial(_zip_sync, store_only=True)
+        else:
+            archive_ext, write_archive = ".zip", _zip_sync
         
         # Generate backup filename
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_filename = f"{request.name}_{timestamp}.zip"
-        backup_file_path = backup_dir / backup_filename
-        
-        # Calculate total files and size
-        total_files = 0
-        total_bytes = 0
-        
-        for source_path in request.source_paths:
-            for root, dirs, files in os.walk(source_path):
-                total_files += len(files)
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    try:
-                        total_bytes += os.path.getsize(file_path)
-                    except OSError:
-                        continue
+        t = time.localtime()
+        timestamp = "%04d%02d%02d_%02d%02d%02d" % (t.tm_year, t.tm_mon, t.tm_mday, t.tm_hour, t.tm_min, t.tm_sec)
+        backup_filename = f"{request.name}_{timestamp}{archive_ext}"
+        backup_file_path = BACKUP_DIR / backup_filename
+        
+        # Compile include/exclude globs once per job
+        include_re = compile_patterns(request.include_patterns)
+        exclude_re = compile_patterns(request.exclude_patterns)
+        dir_exclude_re = compile_dir_patterns(request.exclude_patterns)
+        
+        # Enumerate files once; each DirEntry stat is reused for sizes and headers
+        backup_files = [
+            (file_path, arcname, st)
+            for source_path in request.source_paths
+            for file_path, arcname, st in iter_files(source_path, dir_exclude_re)
+            if should_include_file_compiled(file_path, include_re, exclude_re)
+        ]
+        total_files = len(backup_files)
+        total_bytes = sum(st.st_size for _, _, st in backup_files)
         
         backup_job["total_files"] = total_files
         backup_job["total_bytes"] = total_bytes
         
-        # Create backup
-        files_processed = 0
-        bytes_processed = 0
+        # Create backup in a worker thread so compression doesn't block the event loop
+        loop = asyncio.get_running_loop()
         
-        with zipfile.ZipFile(backup_file_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for source_path in request.source_paths:
-                for root, dirs, files in os.walk(source_path):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        
-                        # Apply include/exclude patterns
-                        if should_include_file(file_path, request.include_patterns, request.exclude_patterns):
-                            try:
-                                zipf.write(file_path, os.path.relpath(file_path, source_path))
-                                files_processed += 1
-                                bytes_processed += os.path.getsize(file_path)
-                                
-                                # Update progress
-                                progress = (files_processed / total_files) * 100 if total_files > 0 else 0
-                                backup_job["progress"] = progress
-                                backup_job["files_processed"] = files_processed
-                                backup_job["bytes_processed"] = bytes_processed
-                                
-                                # Small delay to prevent blocking
-                                await asyncio.sleep(0.01)
-                                
-                            except OSError:
-                                continue
+        def report_progress(files_processed: int, bytes_processed: int):
+            loop.call_soon_threadsafe(update_backup_progress, backup_job, files_processed, bytes_processed)
+        
+        files_processed, bytes_processed = await asyncio.to_thread(
+            write_archive, backup_files, backup_file_path, report_progress
+        )
+        update_backup_progress(backup_job, files_processed, bytes_processed)
         
         # Update backup job
         backup_job["status"] = BackupStatus.COMPLETED
@@ -499,6 +1104,7 @@ async def execute_backup(backup_id: str, request: BackupRequest):
         backup_job["backup_file_path"] = str(backup_file_path)
         backup_job["backup_size"] = os.path.getsize(backup_file_path)
         backup_job["progress"] = 100.0
+        save_backup_job(backup_job)
         
         # Update statistics
         backup_stats["total_backups"] += 1
@@ -506,7 +1112,7 @@ async def execute_backup(backup_id: str, request: BackupRequest):
         backup_stats["total_storage_used"] += backup_job["backup_size"]
         
         # Calculate average backup time
-        backup_time = (backup_job["completed_at"] - backup_job["started_at"]).total_seconds()
+        backup_time = time.perf_counter() - started
         total_successful = backup_stats["successful_backups"]
         backup_stats["average_backup_time"] = (
             (backup_stats["average_backup_time"] * (total_successful - 1) + backup_time) / total_successful
@@ -514,11 +1120,17 @@ async def execute_backup(backup_id: str, request: BackupRequest):
         
     except Exception as e:
         if backup_id in backup_jobs:
-            backup_jobs[backup_id]["status"] = BackupStatus.FAILED
-            backup_jobs[backup_id]["error_message"] = str(e)
-            backup_jobs[backup_id]["completed_at"] = datetime.now()
+            backup_job = backup_jobs[backup_id]
+            backup_job["status"] = BackupStatus.FAILED
+            backup_job["error_message"] = str(e)
+            backup_job["completed_at"] = datetime.now()
+            save_backup_job(backup_job)
         
         backup_stats["failed_backups"] += 1
+    
+    finally:
+        # Finished jobs are served from the database
+        backup_jobs.pop(backup_id, None)
 
 async def execute_restore(restore_id: str, request: RestoreRequest):
     """Execute restore job in background"""
@@ -526,8 +1138,11 @@ async def execute_restore(restore_id: str, request: RestoreRequest):
         restore_job = restore_jobs[restore_id]
         restore_job["status"] = BackupStatus.RESTORING
         restore_job["started_at"] = datetime.now()
+        save_restore_job(restore_job)
         
-        backup_job = backup_jobs[request.backup_id]
+        backup_job = get_backup_job(request.backup_id)
+        if backup_job is None:
+            raise LookupError("Backup not found")
         backup_file_path = backup_job.get("backup_file_path")
         
         if not backup_file_path or not os.path.exists(backup_file_path):
@@ -537,54 +1152,105 @@ async def execute_restore(restore_id: str, request: RestoreRequest):
         restore_path = Path(request.restore_path)
         restore_path.mkdir(parents=True, exist_ok=True)
         
-        # Extract backup
-        with zipfile.ZipFile(backup_file_path, 'r') as zipf:
-            file_list = zipf.namelist()
-            restore_job["total_files"] = len(file_list)
+        if backup_job.get("compression") == CompressionType.ZSTD:
+            # Tar streams have no index, so use the file count recorded at backup time
+            restore_job["total_files"] = backup_job.get("files_processed", 0)
+            loop = asyncio.get_running_loop()
             
-            files_restored = 0
+            def report_progress(files_restored: int):
+                loop.call_soon_threadsafe(update_restore_progress, restore_job, files_restored)
             
-            for file_info in file_list:
-                try:
-                    zipf.extract(file_info, restore_path)
-                    files_restored += 1
-                    
-                    # Update progress
-                    progress = (files_restored / len(file_list)) * 100
-                    restore_job["progress"] = progress
-                    restore_job["files_restored"] = files_restored
-                    
-                    await asyncio.sleep(0.01)
-                    
-                except Exception as e:
-                    # Log error but continue
-                    print(f"Error restoring {file_info}: {e}")
+            files_restored = await asyncio.to_thread(
+                _untar_zstd_sync, backup_file_path, restore_path, report_progress,
+                progress_interval(restore_job["total_files"])
+            )
+            update_restore_progress(restore_job, files_restored)
+        else:
+            # Extract backup
+            with zipfile.ZipFile(backup_file_path, 'r') as zipf:
+                file_list = zipf.namelist()
+                restore_job["total_files"] = len(file_list)
+                
+                files_restored = 0
+                report_every = progress_interval(len(file_list))
+                
+                for file_info in file_list:
+                    try:
+                        zipf.extract(file_info, restore_path)
+                        files_restored += 1
+                        
+                        # Update progress in batches and yield to the loop without sleeping
+                        if files_restored % report_every == 0:
+                            update_restore_progress(restore_job, files_restored)
+                            await asyncio.sleep(0)
+                        
+                    except Exception as e:
+                        # Log error but continue
+                        print(f"Error restoring {file_info}: {e}")
+                
+                update_restore_progress(restore_job, files_restored)
         
         restore_job["status"] = BackupStatus.COMPLETED
         restore_job["completed_at"] = datetime.now()
         restore_job["progress"] = 100.0
+        save_restore_job(restore_job)
         
     except Exception as e:
         if restore_id in restore_jobs:
-            restore_jobs[restore_id]["status"] = BackupStatus.FAILED
-            restore_jobs[restore_id]["error_message"] = str(e)
-            restore_jobs[restore_id]["completed_at"] = datetime.now()
+            restore_job = restore_jobs[restore_id]
+            restore_job["status"] = BackupStatus.FAILED
+            restore_job["error_message"] = str(e)
+            restore_job["completed_at"] = datetime.now()
+            save_restore_job(restore_job)
+    
+    finally:
+        restore_jobs.pop(restore_id, None)
+
+def iter_files(source_path: str, dir_exclude_re=None):
+    """Yield (path, arcname, stat_result) for every file under source_path in one scandir pass
 
-def should_include_file(file_path: str, include_patterns: List[str], exclude_patterns: List[str]) -> bool:
-    """Check if file should be included based on patterns"""
+    Directories whose name matches dir_exclude_re are pruned without being scanned.
+    """
+    pending_dirs = [source_path]
+    while pending_dirs:
+        current_dir = pending_dirs.pop()
+        try:
+            with os.scandir(current_dir) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if dir_exclude_re is None or not dir_exclude_re.match(entry.name):
+                                pending_dirs.append(entry.path)
+                        elif entry.is_file():
+                            yield entry.path, os.path.relpath(entry.path, source_path), entry.stat()
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+
+def compile_patterns(patterns: Optional[List[str]]):
+    """Compile glob patterns into a single regex alternation (None if no patterns)"""
+    if not patterns:
+        return None
+    return re.compile("|".join(fnmatch.translate(pattern) for pattern in patterns))
+
+def compile_dir_patterns(patterns: Optional[List[str]]):
+    """Compile exclude globs for directory pruning; "cache/" style patterns match directories only"""
+    if not patterns:
+        return None
+    return compile_patterns([pattern.rstrip("/") for pattern in patterns if pattern.rstrip("/")])
+
+def should_include_file_compiled(file_path: str, include_re, exclude_re) -> bool:
+    """Check if file should be included based on precompiled patterns"""
     filename = os.path.basename(file_path)
     
     # Check exclude patterns
-    for pattern in exclude_patterns:
-        if pattern in filename:
-            return False
+    if exclude_re is not None and exclude_re.match(filename):
+        return False
     
     # Check include patterns (if specified)
-    if include_patterns:
-        for pattern in include_patterns:
-            if pattern in filename:
-                return True
-        return False
+    if include_re is not None:
+        return include_re.match(filename) is not None
     
     return True
 
@@ -1,17 +1,39 @@
 from fastapi import FastAPI, HTTPException, UploadFile, File, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Dict, Optional, Any, Union
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import BaseModel, ConfigDict
+from typing import List, Dict, Optional, Any, Union, Tuple
 import asyncio
 import json
-import uuid
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import secrets
 import hashlib
-import base64
 from datetime import datetime, timedelta
-from enum import Enum
+from enum import Enum, IntEnum
+from collections import deque
+from array import array
 import random
-
-app = FastAPI(title="Biometric Authentication API", version="1.0.0")
+import numpy as np
+import orjson
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+try:
+    from pybase64 import b64decode  # SIMD-accelerated, same API as base64.b64decode
+except ImportError:
+    from base64 import b64decode
+
+app = FastAPI(
+    title="Biometric Authentication API",
+    version="1.0.0",
+    default_response_class=ORJSONResponse
+)
 
 # CORS middleware
 app.add_middleware(
@@ -33,6 +55,22 @@ class BiometricType(str, Enum):
     SIGNATURE = "signature"
     KEystroke = "keystroke"
 
+class BiometricTypeCode(IntEnum):
+    """Integer codes for BiometricType, used as keys in the template indexes"""
+    FINGERPRINT = 0
+    FACE = 1
+    VOICE = 2
+    IRIS = 3
+    RETINA = 4
+    PALM = 5
+    SIGNATURE = 6
+    KEYSTROKE = 7
+
+# Converted once at request ingress
+BIOMETRIC_TYPE_CODES: Dict[BiometricType, BiometricTypeCode] = {
+    biometric_type: BiometricTypeCode(i) for i, biometric_type in enumerate(BiometricType)
+}
+
 class AuthStatus(str, Enum):
     PENDING = "pending"
     AUTHENTICATED = "authenticated"
@@ -42,6 +80,8 @@ class AuthStatus(str, Enum):
 
 # Data models
 class BiometricTemplate(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+    
     id: str
     user_id: str
     biometric_type: BiometricType
@@ -59,6 +99,8 @@ class AuthenticationRequest(BaseModel):
     challenge: Optional[str] = None  # For liveness detection
 
 class AuthenticationResult(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+    
     request_id: str
     user_id: str
     biometric_type: BiometricType
@@ -104,6 +146,8 @@ class SecurityPolicy(BaseModel):
     lockout_duration_minutes: int
 
 class AuditLog(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+    
     id: str
     user_id: str
     event_type: str  # "login", "logout", "template_created", "template_deleted"
@@ -114,55 +158,162 @@ class AuditLog(BaseModel):
     timestamp: datetime
     details: Optional[Dict[str, Any]] = None
 
+# Event types are stored as small integer codes in AuditLogStore
+EVENT_TYPE_CODES: Dict[str, int] = {}
+EVENT_TYPE_NAMES: List[str] = []
+
+def event_type_code(event_type: str) -> int:
+    code = EVENT_TYPE_CODES.get(event_type)
+    if code is None:
+        code = EVENT_TYPE_CODES[event_type] = len(EVENT_TYPE_NAMES)
+        EVENT_TYPE_NAMES.append(event_type)
+    return code
+
+class AuditLogStore:
+    """One user's audit events as parallel columns; AuditLog models are built only when read"""
+    __slots__ = ("ids", "event_types", "biometric_types", "successes",
+                 "ip_addresses", "user_agents", "timestamps", "details")
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.event_types = array("I")
+        self.biometric_types: List[Optional[BiometricType]] = []
+        self.successes = array("b")
+        self.ip_addresses: List[Optional[str]] = []
+        self.user_agents: List[Optional[str]] = []
+        self.timestamps = array("d")  # epoch seconds
+        self.details: List[Optional[Dict[str, Any]]] = []
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def append(self, log_id: str, event_type: str, success: bool, timestamp: float,
+               biometric_type: Optional[BiometricType] = None, ip_address: Optional[str] = None,
+               user_agent: Optional[str] = None, details: Optional[Dict[str, Any]] = None):
+        self.ids.append(log_id)
+        self.event_types.append(event_type_code(event_type))
+        self.biometric_types.append(biometric_type)
+        self.successes.append(success)
+        self.ip_addresses.append(ip_address)
+        self.user_agents.append(user_agent)
+        self.timestamps.append(timestamp)
+        self.details.append(details)
+
+    def to_model(self, user_id: str, i: int) -> AuditLog:
+        return AuditLog(
+            id=self.ids[i],
+            user_id=user_id,
+            event_type=EVENT_TYPE_NAMES[self.event_types[i]],
+            biometric_type=self.biometric_types[i],
+            success=bool(self.successes[i]),
+            ip_address=self.ip_addresses[i],
+            user_agent=self.user_agents[i],
+            timestamp=datetime.fromtimestamp(self.timestamps[i]),
+            details=self.details[i]
+        )
+
 # In-memory storage
 users: Dict[str, User] = {}
 biometric_templates: Dict[str, BiometricTemplate] = {}
 auth_sessions: Dict[str, AuthenticationSession] = {}
 auth_requests: Dict[str, AuthenticationRequest] = {}
 auth_results: Dict[str, AuthenticationResult] = {}
+auth_result_json: Dict[str, bytes] = {}
 security_policies: Dict[str, SecurityPolicy] = {}
-audit_logs: Dict[str, List[AuditLog]] = {}
+audit_logs: Dict[str, AuditLogStore] = {}
+# Active template IDs per user and biometric type, in enrollment order
+user_templates_index: Dict[str, Dict[BiometricTypeCode, List[str]]] = {}
+# Template bytes decoded once at enrollment, keyed by template ID
+decoded_templates: Dict[str, np.ndarray] = {}
+# Stacked (K, L) template matrices per (user, biometric type), bucketed by template
+# length; built lazily and dropped whenever that user's templates of the type change
+template_matrices: Dict[tuple, Dict[int, tuple]] = {}
+
+# Running statistics so /api/stats doesn't rescan results, templates and logs
+RECENT_ACTIVITY_WINDOW = timedelta(hours=24)
+stats_counters = {"auth_success": 0, "confidence_sum": 0.0}
+active_template_counts: Dict[str, int] = {}
+recent_audit_timestamps: deque = deque()
 
 # Utility functions
 def generate_user_id() -> str:
     """Generate unique user ID"""
-    return f"user_{uuid.uuid4().hex[:8]}"
+    return f"user_{secrets.token_hex(4)}"
 
 def generate_template_id() -> str:
     """Generate unique template ID"""
-    return f"template_{uuid.uuid4().hex[:8]}"
+    return f"template_{secrets.token_hex(4)}"
 
 def generate_request_id() -> str:
     """Generate unique request ID"""
-    return f"req_{uuid.uuid4().hex[:8]}"
+    return f"req_{secrets.token_hex(4)}"
 
 def generate_session_id() -> str:
     """Generate unique session ID"""
-    return f"session_{uuid.uuid4().hex[:8]}"
-
-def calculate_match_score(template1: str, template2: str) -> float:
-    """Calculate biometric match score (mock implementation)"""
-    # In a real implementation, this would use sophisticated matching algorithms
-    # For now, we'll simulate matching with some randomness
-    
-    # Convert to bytes for comparison
-    t1_bytes = base64.b64decode(template1)
-    t2_bytes = base64.b64decode(template2)
-    
-    # Simple similarity calculation (mock)
-    if len(t1_bytes) != len(t2_bytes):
-        return 0.0
-    
-    matching_bytes = sum(1 for a, b in zip(t1_bytes, t2_bytes) if a == b)
-    base_similarity = matching_bytes / len(t1_bytes)
-    
-    # Add some randomness to simulate real biometric variation
-    noise = random.gauss(0, 0.1)
-    match_score = max(0.0, min(1.0, base_similarity + noise))
-    
-    return match_score
-
-def calculate_liveness_score(biometric_data: str, challenge: Optional[str] = None) -> float:
+    return f"session_{secrets.token_hex(4)}"
+
+if njit is not None:
+    @njit(cache=True, fastmath=True, nogil=True)
+    def byte_match_ratios(matrix, probe):
+        """Fraction of bytes equal to probe in each row of a (K, L) uint8 matrix"""
+        rows, n = matrix.shape
+        ratios = np.empty(rows)
+        for r in range(rows):
+            matches = 0
+            for i in range(n):
+                if matrix[r, i] == probe[i]:
+                    matches += 1
+            ratios[r] = matches / n
+        return ratios
+
+    # Compile at import so the first authentication doesn't pay for it
+    byte_match_ratios(np.zeros((1, 16), dtype=np.uint8), np.zeros(16, dtype=np.uint8))
+else:
+    def byte_match_ratios(matrix, probe):
+        """Fraction of bytes equal to probe in each row of a (K, L) uint8 matrix"""
+        return np.count_nonzero(matrix == probe, axis=1) / probe.size
+
+_thread_state = threading.local()
+
+def get_rng() -> np.random.Generator:
+    """Per-thread NumPy generator (Generator instances are not thread-safe)"""
+    generator = getattr(_thread_state, "rng", None)
+    if generator is None:
+        generator = _thread_state.rng = np.random.default_rng()
+    return generator
+
+# Template scoring runs here so CPU-bound matching doesn't block the event loop
+AUTH_EXECUTOR = ThreadPoolExecutor(max_workers=os.cpu_count())
+
+def decode_biometric_data(data: str) -> np.ndarray:
+    """Decode base64 biometric data into a uint8 array"""
+    return np.frombuffer(b64decode(data), dtype=np.uint8)
+
+def score_probe(biometric_data: str, template_buckets: Dict[int, tuple]) -> Tuple[Optional[str], float, float]:
+    """Find the best-matching template for a probe; returns (template_id, match_score, liveness_noise).
+
+    Pure function run in AUTH_EXECUTOR. Every template of the probe's length is
+    scored in one pass; templates of other lengths can't match.
+    """
+    probe = decode_biometric_data(biometric_data)
+    bucket = template_buckets.get(probe.size) if probe.size else None
+    
+    # One batched draw covers the per-template match noise and the liveness noise
+    candidates = len(bucket[1]) if bucket is not None else 0
+    noise = get_rng().standard_normal(candidates + 1)
+    
+    best_template_id, best_score = None, 0.0
+    if bucket is not None:
+        matrix, bucket_ids = bucket
+        match_scores = np.clip(byte_match_ratios(matrix, probe) + noise[:candidates] * 0.1, 0.0, 1.0)
+        best_idx = int(match_scores.argmax())
+        if match_scores[best_idx] > 0.0:
+            best_template_id, best_score = bucket_ids[best_idx], float(match_scores[best_idx])
+    
+    return best_template_id, best_score, float(noise[candidates]) * 0.05
+
+def calculate_liveness_score(biometric_data: str, challenge: Optional[str] = None,
+                             noise: Optional[float] = None) -> float:
     """Calculate liveness detection score (mock implementation)"""
     # In a real implementation, this would analyze various liveness indicators
     # For now, we'll simulate with randomness
@@ -172,11 +323,12 @@ def calculate_liveness_score(biometric_data: str, challenge: Optional[str] = Non
     # Simulate challenge-response for face recognition
     if challenge:
         # Check if challenge was properly responded to
-        challenge_response = random.random()
+        challenge_response = get_rng().random()
         base_score += challenge_response * 0.3
     
     # Add some randomness
-    noise = random.gauss(0, 0.05)
+    if noise is None:
+        noise = get_rng().normal(0, 0.05)
     liveness_score = max(0.0, min(1.0, base_score + noise))
     
     return liveness_score
@@ -192,15 +344,15 @@ def calculate_confidence_score(match_score: float, liveness_score: Optional[floa
     
     return max(0.0, min(1.0, confidence))
 
-def is_user_locked(user: User) -> bool:
+def is_user_locked(user: User, now: Optional[datetime] = None) -> bool:
     """Check if user account is locked"""
     if user.locked_until is None:
         return False
-    return datetime.now() < user.locked_until
+    return (now or datetime.now()) < user.locked_until
 
-def lock_user(user: User, duration_minutes: int = 15):
+def lock_user(user: User, duration_minutes: int = 15, now: Optional[datetime] = None):
     """Lock user account for specified duration"""
-    user.locked_until = datetime.now() + timedelta(minutes=duration_minutes)
+    user.locked_until = (now or datetime.now()) + timedelta(minutes=duration_minutes)
     user.failed_attempts = 0
 
 def unlock_user(user: User):
@@ -208,29 +360,77 @@ def unlock_user(user: User):
     user.locked_until = None
     user.failed_attempts = 0
 
-def create_audit_log(user_id: str, event_type: str, success: bool, **kwargs):
+def create_audit_log(user_id: str, event_type: str, success: bool,
+                     timestamp: Optional[datetime] = None, **kwargs):
     """Create audit log entry"""
-    log_id = f"log_{uuid.uuid4().hex[:8]}"
+    log_id = f"log_{secrets.token_hex(4)}"
+    now = timestamp or datetime.now()
     
-    log = AuditLog(
-        id=log_id,
-        user_id=user_id,
-        event_type=event_type,
+    if user_id not in audit_logs:
+        audit_logs[user_id] = AuditLogStore()
+    audit_logs[user_id].append(
+        log_id, event_type, success, now.timestamp(),
         biometric_type=kwargs.get("biometric_type"),
-        success=success,
         ip_address=kwargs.get("ip_address"),
         user_agent=kwargs.get("user_agent"),
-        timestamp=datetime.now(),
         details=kwargs.get("details")
     )
     
-    if user_id not in audit_logs:
-        audit_logs[user_id] = []
-    audit_logs[user_id].append(log)
+    recent_audit_timestamps.append(now)
+    prune_recent_activity(now)
+
+def prune_recent_activity(now: datetime):
+    """Drop audit timestamps that fell out of the 24h activity window"""
+    cutoff = now - RECENT_ACTIVITY_WINDOW
+    while recent_audit_timestamps and recent_audit_timestamps[0] <= cutoff:
+        recent_audit_timestamps.popleft()
+
+def get_template_matrices(user_id: str, type_code: BiometricTypeCode) -> Dict[int, tuple]:
+    """Active templates of a user and type as {length: (stacked uint8 matrix, template IDs)}"""
+    key = (user_id, type_code)
+    buckets = template_matrices.get(key)
+    if buckets is None:
+        grouped: Dict[int, List[str]] = {}
+        for tid in user_templates_index.get(user_id, {}).get(type_code, ()):
+            if biometric_templates[tid].is_active:
+                grouped.setdefault(decoded_templates[tid].size, []).append(tid)
+        buckets = {
+            length: (np.stack([decoded_templates[tid] for tid in ids]), ids)
+            for length, ids in grouped.items()
+        }
+        template_matrices[key] = buckets
+    return buckets
+
+def failed_auth_result(request_id: str, request: AuthenticationRequest, reason: str,
+                       status: AuthStatus = AuthStatus.FAILED,
+                       timestamp: Optional[datetime] = None) -> AuthenticationResult:
+    """Build a zero-score result; fields are internal, so validation is skipped"""
+    return AuthenticationResult.model_construct(
+        request_id=request_id,
+        user_id=request.user_id,
+        biometric_type=request.biometric_type,
+        status=status,
+        confidence_score=0.0,
+        match_score=0.0,
+        liveness_score=None,
+        processing_time=0.0,
+        timestamp=timestamp or datetime.now(),
+        failure_reason=reason
+    )
+
+def record_auth_result(result: AuthenticationResult):
+    """Store an authentication result and update the running statistics"""
+    auth_results[result.request_id] = result
+    # Results never change once written, so serialize them once for polling clients
+    auth_result_json[result.request_id] = orjson.dumps(result.model_dump())
+    if result.status == AuthStatus.AUTHENTICATED:
+        stats_counters["auth_success"] += 1
+    stats_counters["confidence_sum"] += result.confidence_score
 
 async def process_authentication(request_id: str):
     """Process biometric authentication request"""
-    start_time = datetime.now()
+    started = time.perf_counter()
+    now = datetime.now()
     
     try:
         request = auth_requests[request_id]
@@ -238,69 +438,36 @@ async def process_authentication(request_id: str):
         
         if not user:
             # Create failed result
-            result = AuthenticationResult(
-                request_id=request_id,
-                user_id=request.user_id,
-                biometric_type=request.biometric_type,
-                status=AuthStatus.FAILED,
-                confidence_score=0.0,
-                match_score=0.0,
-                processing_time=0.0,
-                timestamp=datetime.now(),
-                failure_reason="User not found"
-            )
-            auth_results[request_id] = result
-            create_audit_log(request.user_id, "login", False, biometric_type=request.biometric_type, details={"reason": "User not found"})
+            result = failed_auth_result(request_id, request, "User not found", timestamp=now)
+            record_auth_result(result)
+            create_audit_log(request.user_id, "login", False, timestamp=now, biometric_type=request.biometric_type, details={"reason": "User not found"})
             return
         
         # Check if user is locked
-        if is_user_locked(user):
-            result = AuthenticationResult(
-                request_id=request_id,
-                user_id=request.user_id,
-                biometric_type=request.biometric_type,
-                status=AuthStatus.LOCKED,
-                confidence_score=0.0,
-                match_score=0.0,
-                processing_time=0.0,
-                timestamp=datetime.now(),
-                failure_reason="Account locked"
-            )
-            auth_results[request_id] = result
-            create_audit_log(request.user_id, "login", False, biometric_type=request.biometric_type, details={"reason": "Account locked"})
+        if is_user_locked(user, now):
+            result = failed_auth_result(request_id, request, "Account locked", status=AuthStatus.LOCKED, timestamp=now)
+            record_auth_result(result)
+            create_audit_log(request.user_id, "login", False, timestamp=now, biometric_type=request.biometric_type, details={"reason": "Account locked"})
             return
         
-        # Find matching biometric template
-        user_templates = [t for t in biometric_templates.values() if t.user_id == user.id and t.biometric_type == request.biometric_type and t.is_active]
+        # Find matching biometric templates
+        template_buckets = get_template_matrices(user.id, BIOMETRIC_TYPE_CODES[request.biometric_type])
         
-        if not user_templates:
-            result = AuthenticationResult(
-                request_id=request_id,
-                user_id=request.user_id,
-                biometric_type=request.biometric_type,
-                status=AuthStatus.FAILED,
-                confidence_score=0.0,
-                match_score=0.0,
-                processing_time=0.0,
-                timestamp=datetime.now(),
-                failure_reason="No biometric template found"
-            )
-            auth_results[request_id] = result
-            create_audit_log(request.user_id, "login", False, biometric_type=request.biometric_type, details={"reason": "No template found"})
+        if not template_buckets:
+            result = failed_auth_result(request_id, request, "No biometric template found", timestamp=now)
+            record_auth_result(result)
+            create_audit_log(request.user_id, "login", False, timestamp=now, biometric_type=request.biometric_type, details={"reason": "No template found"})
             return
         
-        # Find best matching template
-        best_match = None
-        best_score = 0.0
-        
-        for template in user_templates:
-            match_score = calculate_match_score(template.template_data, request.biometric_data)
-            if match_score > best_score:
-                best_score = match_score
-                best_match = template
+        # Decode and score the probe off the event loop
+        best_template_id, best_score, liveness_noise = await asyncio.get_running_loop().run_in_executor(
+            AUTH_EXECUTOR, score_probe, request.biometric_data, template_buckets
+        )
+        best_match = biometric_templates[best_template_id] if best_template_id else None
+        now = datetime.now()
         
         # Calculate liveness score
-        liveness_score = calculate_liveness_score(request.biometric_data, request.challenge)
+        liveness_score = calculate_liveness_score(request.biometric_data, request.challenge, liveness_noise)
         
         # Calculate confidence score
         confidence_score = calculate_confidence_score(best_score, liveness_score, best_match.quality_score if best_match else 0.0)
@@ -311,11 +478,11 @@ async def process_authentication(request_id: str):
         # Determine authentication result
         if confidence_score >= min_confidence:
             status = AuthStatus.AUTHENTICATED
-            user.last_login = datetime.now()
+            user.last_login = now
             user.failed_attempts = 0
             failure_reason = None
             
-            create_audit_log(user.id, "login", True, biometric_type=request.biometric_type, 
+            create_audit_log(user.id, "login", True, timestamp=now, biometric_type=request.biometric_type,
                            details={"confidence": confidence_score, "match_score": best_score})
         else:
             status = AuthStatus.FAILED
@@ -324,13 +491,13 @@ async def process_authentication(request_id: str):
             
             # Lock user after too many failed attempts
             if user.failed_attempts >= 3:
-                lock_user(user)
+                lock_user(user, now=now)
                 failure_reason += " - Account locked"
             
-            create_audit_log(user.id, "login", False, biometric_type=request.biometric_type,
+            create_audit_log(user.id, "login", False, timestamp=now, biometric_type=request.biometric_type,
                            details={"confidence": confidence_score, "match_score": best_score, "reason": failure_reason})
         
-        processing_time = (datetime.now() - start_time).total_seconds()
+        processing_time = time.perf_counter() - started
         
         result = AuthenticationResult(
             request_id=request_id,
@@ -341,26 +508,16 @@ async def process_authentication(request_id: str):
             match_score=best_score,
             liveness_score=liveness_score,
             processing_time=processing_time,
-            timestamp=datetime.now(),
+            timestamp=now,
             failure_reason=failure_reason
         )
         
-        auth_results[request_id] = result
+        record_auth_result(result)
         
     except Exception as e:
         # Create failed result for any errors
-        result = AuthenticationResult(
-            request_id=request_id,
-            user_id=request.user_id,
-            biometric_type=request.biometric_type,
-            status=AuthStatus.FAILED,
-            confidence_score=0.0,
-            match_score=0.0,
-            processing_time=0.0,
-            timestamp=datetime.now(),
-            failure_reason=f"Processing error: {str(e)}"
-        )
-        auth_results[request_id] = result
+        result = failed_auth_result(request_id, request, f"Processing error: {str(e)}")
+        record_auth_result(result)
 
 # API Endpoints
 @app.post("/api/users", response_model=User)
@@ -394,6 +551,11 @@ async def create_biometric_template(user_id: str, biometric_type: BiometricType,
     if user_id not in users:
         raise HTTPException(status_code=404, detail="User not found")
     
+    try:
+        decoded = decode_biometric_data(template_data)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Template data must be valid base64")
+    
     template_id = generate_template_id()
     
     # Calculate quality score (mock implementation)
@@ -410,6 +572,11 @@ async def create_biometric_template(user_id: str, biometric_type: BiometricType,
     )
     
     biometric_templates[template_id] = template
+    decoded_templates[template_id] = decoded
+    active_template_counts[biometric_type.value] = active_template_counts.get(biometric_type.value, 0) + 1
+    type_code = BIOMETRIC_TYPE_CODES[biometric_type]
+    user_templates_index.setdefault(user_id, {}).setdefault(type_code, []).append(template_id)
+    template_matrices.pop((user_id, type_code), None)
     
     # Update user's template list
     users[user_id].biometric_templates.append(template_id)
@@ -425,12 +592,12 @@ async def get_user_biometric_templates(user_id: str, biometric_type: Optional[Bi
     if user_id not in users:
         raise HTTPException(status_code=404, detail="User not found")
     
-    templates = [t for t in biometric_templates.values() if t.user_id == user_id and t.is_active]
-    
     if biometric_type:
-        templates = [t for t in templates if t.biometric_type == biometric_type]
+        template_ids = user_templates_index.get(user_id, {}).get(BIOMETRIC_TYPE_CODES[biometric_type], ())
+    else:
+        template_ids = users[user_id].biometric_templates
     
-    return templates
+    return [biometric_templates[tid] for tid in template_ids if biometric_templates[tid].is_active]
 
 @app.post("/api/authenticate", response_model=Dict[str, str])
 async def initiate_authentication(request: AuthenticationRequest, background_tasks: BackgroundTasks):
@@ -449,10 +616,11 @@ async def initiate_authentication(request: AuthenticationRequest, background_tas
 @app.get("/api/authenticate/{request_id}/result", response_model=AuthenticationResult)
 async def get_authentication_result(request_id: str):
     """Get authentication result"""
-    if request_id not in auth_results:
+    result_json = auth_result_json.get(request_id)
+    if result_json is None:
         raise HTTPException(status_code=404, detail="Authentication request not found or not completed")
     
-    return auth_results[request_id]
+    return Response(result_json, media_type="application/json")
 
 @app.post("/api/authenticate/{request_id}/challenge", response_model=Dict[str, str])
 async def generate_liveness_challenge(request_id: str):
@@ -490,7 +658,18 @@ async def delete_biometric_template(user_id: str, template_id: str):
         raise HTTPException(status_code=403, detail="Template does not belong to user")
     
     # Deactivate template (soft delete)
-    template.is_active = False
+    if template.is_active:
+        bio_type = template.biometric_type.value
+        active_template_counts[bio_type] -= 1
+        if not active_template_counts[bio_type]:
+            del active_template_counts[bio_type]
+    biometric_templates[template_id] = template.model_copy(update={"is_active": False})
+    decoded_templates.pop(template_id, None)
+    type_code = BIOMETRIC_TYPE_CODES[template.biometric_type]
+    type_ids = user_templates_index.get(user_id, {}).get(type_code)
+    if type_ids and template_id in type_ids:
+        type_ids.remove(template_id)
+    template_matrices.pop((user_id, type_code), None)
     
     # Remove from user's template list
     if template_id in users[user_id].biometric_templates:
@@ -520,114 +699,125 @@ async def get_user_audit_logs(user_id: str, limit: int = 100, event_type: Option
     if user_id not in users:
         raise HTTPException(status_code=404, detail="User not found")
     
-    logs = audit_logs.get(user_id, [])
+    store = audit_logs.get(user_id)
+    if store is None:
+        return []
     
+    rows = np.arange(len(store))
     if event_type:
-        logs = [log for log in logs if log.event_type == event_type]
-    
-    return sorted(logs, key=lambda x: x.timestamp, reverse=True)[:limit]
+        code = EVENT_TYPE_CODES.get(event_type)
+        if code is None:
+            return []
+        rows = rows[np.frombuffer(store.event_types, dtype=np.uint32) == code]
+    
+    # Newest first; select the top `limit` in O(N) before sorting just those rows
+    keys = -np.frombuffer(store.timestamps, dtype=np.float64)[rows]
+    if 0 < limit < rows.size:
+        kth = np.partition(keys, limit - 1)[limit - 1]
+        ahead = np.flatnonzero(keys < kth)
+        tied = np.flatnonzero(keys == kth)[:limit - ahead.size]
+        selected = np.concatenate((ahead, tied))
+        rows, keys = rows[selected], keys[selected]
+    # Ties keep insertion order
+    newest = rows[np.lexsort((rows, keys))][:max(limit, 0)]
+    
+    return [store.to_model(user_id, int(i)) for i in newest]
 
 @app.get("/api/stats")
 async def get_authentication_stats():
     """Get authentication statistics"""
     total_users = len(users)
-    total_templates = len([t for t in biometric_templates.values() if t.is_active])
     total_auth_requests = len(auth_results)
     
-    # Calculate success rate
-    successful_auths = len([r for r in auth_results.values() if r.status == AuthStatus.AUTHENTICATED])
+    # Calculate success rate from the running counters
+    successful_auths = stats_counters["auth_success"]
     success_rate = successful_auths / total_auth_requests if total_auth_requests > 0 else 0
     
-    # Biometric type distribution
-    biometric_distribution = {}
-    for template in biometric_templates.values():
-        if template.is_active:
-            bio_type = template.biometric_type.value
-            biometric_distribution[bio_type] = biometric_distribution.get(bio_type, 0) + 1
-    
     # Recent activity
-    recent_logs = []
-    for user_logs in audit_logs.values():
-        recent_logs.extend([log for log in user_logs if log.timestamp > datetime.now() - timedelta(hours=24)])
+    prune_recent_activity(datetime.now())
     
-    return {
+    return ORJSONResponse({
         "total_users": total_users,
-        "total_templates": total_templates,
+        "total_templates": sum(active_template_counts.values()),
         "total_authentications": total_auth_requests,
         "success_rate": success_rate,
-        "biometric_distribution": biometric_distribution,
-        "recent_activity_24h": len(recent_logs),
+        "biometric_distribution": dict(active_template_counts),
+        "recent_activity_24h": len(recent_audit_timestamps),
         "supported_biometric_types": [t.value for t in BiometricType],
-        "average_confidence_score": sum(r.confidence_score for r in auth_results.values()) / len(auth_results) if auth_results else 0
-    }
+        "average_confidence_score": stats_counters["confidence_sum"] / total_auth_requests if total_auth_requests else 0
+    })
+
+# Static payloads are serialized once at import
+BIOMETRIC_TYPES_JSON = orjson.dumps({
+    "types": [
+        {
+            "type": "fingerprint",
+            "name": "Fingerprint Recognition",
+            "description": "Fingerprint pattern matching",
+            "accuracy": 0.95,
+            "liveness_support": True
+        },
+        {
+            "type": "face",
+            "name": "Face Recognition",
+            "description": "Facial feature analysis",
+            "accuracy": 0.97,
+            "liveness_support": True
+        },
+        {
+            "type": "iris",
+            "name": "Iris Recognition",
+            "description": "Iris pattern matching",
+            "accuracy": 0.99,
+            "liveness_support": True
+        },
+        {
+            "type": "voice",
+            "name": "Voice Recognition",
+            "description": "Voice print analysis",
+            "accuracy": 0.92,
+            "liveness_support": True
+        },
+        {
+            "type": "retina",
+            "name": "Retina Scan",
+            "description": "Retinal blood vessel pattern",
+            "accuracy": 0.98,
+            "liveness_support": False
+        },
+        {
+            "type": "palm",
+            "name": "Palm Recognition",
+            "description": "Palm print and vein pattern",
+            "accuracy": 0.94,
+            "liveness_support": True
+        },
+        {
+            "type": "signature",
+            "name": "Signature Verification",
+            "description": "Handwritten signature analysis",
+            "accuracy": 0.88,
+            "liveness_support": False
+        },
+        {
+            "type": "keystroke",
+            "name": "Keystroke Dynamics",
+            "description": "Typing rhythm analysis",
+            "accuracy": 0.85,
+            "liveness_support": True
+        }
+    ]
+})
+ROOT_JSON = orjson.dumps({"message": "Biometric Authentication API", "version": "1.0.0"})
 
 @app.get("/api/biometric-types")
 async def get_supported_biometric_types():
     """Get supported biometric types"""
-    return {
-        "types": [
-            {
-                "type": "fingerprint",
-                "name": "Fingerprint Recognition",
-                "description": "Fingerprint pattern matching",
-                "accuracy": 0.95,
-                "liveness_support": True
-            },
-            {
-                "type": "face",
-                "name": "Face Recognition",
-                "description": "Facial feature analysis",
-                "accuracy": 0.97,
-                "liveness_support": True
-            },
-            {
-                "type": "iris",
-                "name": "Iris Recognition",
-                "description": "Iris pattern matching",
-                "accuracy": 0.99,
-                "liveness_support": True
-            },
-            {
-                "type": "voice",
-                "name": "Voice Recognition",
-                "description": "Voice print analysis",
-                "accuracy": 0.92,
-                "liveness_support": True
-            },
-            {
-                "type": "retina",
-                "name": "Retina Scan",
-                "description": "Retinal blood vessel pattern",
-                "accuracy": 0.98,
-                "liveness_support": False
-            },
-            {
-                "type": "palm",
-                "name": "Palm Recognition",
-                "description": "Palm print and vein pattern",
-                "accuracy": 0.94,
-                "liveness_support": True
-            },
-            {
-                "type": "signature",
-                "name": "Signature Verification",
-                "description": "Handwritten signature analysis",
-                "accuracy": 0.88,
-                "liveness_support": False
-            },
-            {
-                "type": "keystroke",
-                "name": "Keystroke Dynamics",
-                "description": "Typing rhythm analysis",
-                "accuracy": 0.85,
-                "liveness_support": True
-            }
-        ]
-    }
+    return Response(BIOMETRIC_TYPES_JSON, media_type="application/json")
 
 @app.get("/")
 async def root():
-    return {"message": "Biometric Authentication API", "version": "1.0.0"}
+    return Response(ROOT_JSON, media_type="application/json")
 
 if __name__ == "__main__":
     import uvicorn
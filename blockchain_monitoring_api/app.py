@@ -1,15 +1,28 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from typing import List, Dict, Optional, Any
 import asyncio
+import bisect
+import heapq
 import aiohttp
 import json
+from collections import Counter, OrderedDict, defaultdict, deque
 from datetime import datetime, timedelta
+from dataclasses import dataclass, replace
+from operator import itemgetter
 import hashlib
+import itertools
+import os
 import time
+import uuid
 
-app = FastAPI(title="Blockchain Transaction Monitoring API", version="1.0.0")
+app = FastAPI(
+    title="Blockchain Transaction Monitoring API",
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+)
 
 # CORS middleware
 app.add_middleware(
@@ -56,11 +69,98 @@ class MonitoringConfig(BaseModel):
     monitoring_interval: int = 60  # seconds
     supported_chains: List[str] = ["ethereum", "bitcoin", "polygon"]
 
+# Internal records: slotted rows in the stores, Pydantic models only at the API boundary
+@dataclass(slots=True, frozen=True)
+class TransactionRecord:
+    hash: str
+    block_number: int
+    from_address: str
+    to_address: str
+    value: str
+    gas_used: str
+    gas_price: str
+    timestamp: datetime
+    status: str
+    confirmations: int
+    value_wei: int  # value parsed once to an exact integer
+
+    def to_model(self) -> Transaction:
+        return Transaction.model_construct(**{name: getattr(self, name) for name in Transaction.model_fields})
+
+@dataclass(slots=True, frozen=True)
+class AlertRecord:
+    id: str
+    wallet_address: str
+    transaction_hash: str
+    alert_type: str
+    message: str
+    severity: str
+    timestamp: datetime
+    is_resolved: bool = False
+
+    def to_model(self) -> Alert:
+        return Alert.model_construct(**{name: getattr(self, name) for name in Alert.model_fields})
+
+class BoundedStore(OrderedDict):
+    """OrderedDict capped at max_size entries, evicting the least recently used"""
+    
+    def __init__(self, max_size: int):
+        super().__init__()
+        self.max_size = max_size
+        self.on_evict = None  # called with each evicted value
+    
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        self.move_to_end(key)
+        return value
+    
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        while len(self) > self.max_size:
+            _, evicted = self.popitem(last=False)
+            if self.on_evict is not None:
+                self.on_evict(evicted)
+    
+    def peek(self, key):
+        """Read a value without marking it as recently used"""
+        return super().__getitem__(key)
+    
+    def touch(self, key) -> bool:
+        """Mark key as recently used; return whether it is present"""
+        if key in self:
+            self.move_to_end(key)
+            return True
+        return False
+
 # In-memory storage
+MAX_STORED_TRANSACTIONS = int(os.getenv("MAX_STORED_TRANSACTIONS", "100000"))
+MAX_STORED_ALERTS = int(os.getenv("MAX_STORED_ALERTS", "100000"))
+
 monitored_wallets: Dict[str, Wallet] = {}
-transactions: Dict[str, Transaction] = {}
-alerts: Dict[str, Alert] = {}
+transactions: Dict[str, TransactionRecord] = BoundedStore(MAX_STORED_TRANSACTIONS)
+alerts: Dict[str, AlertRecord] = BoundedStore(MAX_STORED_ALERTS)
 monitoring_active: bool = False
+monitor_task: Optional[asyncio.Task] = None
+
+# Secondary transaction indexes
+HIGH_FREQUENCY_WINDOW = timedelta(hours=1)
+recent_tx_by_to: Dict[str, deque] = defaultdict(deque)  # to_address -> recent timestamps
+tx_by_address: Dict[str, List[tuple]] = defaultdict(list)  # address -> [(-timestamp, hash)], newest first
+_sort_key = itemgetter(0)
+
+# Alert indexes; IDs sort in creation order, so (-timestamp, id) keeps ties oldest first
+alerts_by_severity: Dict[str, List[tuple]] = defaultdict(list)  # severity -> [(-timestamp, id)], newest first
+unresolved_alert_ids: set = set()
+
+# Running aggregates for /api/stats and /api/monitoring/status
+ALERT_SEVERITIES = ("low", "medium", "high", "critical")
+stats_state = {
+    "total_value_wei": 0,  # exact integer sum, converted to ETH on read
+    "failed_count": 0,
+    "unresolved_alerts": 0,
+    "alert_severity": Counter(),
+}
 
 # Blockchain API endpoints (mock implementations)
 BLOCKCHAIN_APIS = {
@@ -69,32 +169,48 @@ BLOCKCHAIN_APIS = {
     "polygon": "https://api.polygonscan.com/api"
 }
 
+# Detection thresholds
+LARGE_TX_WEI = 100 * 10**18  # 100 ETH
+
+# Outbound concurrency limits
+FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", "32"))
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", "100"))
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "16"))
+fetch_sem = asyncio.Semaphore(FETCH_CONCURRENCY)
+
+# Alert IDs: per-process random prefix + monotonic counter
+_alert_prefix = uuid.uuid4().hex[:8]
+_alert_counter = itertools.count()
+
 # Utility functions
 def generate_alert_id() -> str:
     """Generate unique alert ID"""
-    return hashlib.md5(f"{time.time()}_{len(alerts)}".encode()).hexdigest()
+    return f"{_alert_prefix}{next(_alert_counter):016x}"
 
-def format_wei_to_eth(wei_value: str) -> float:
-    """Convert Wei to ETH"""
+def parse_wei(wei_value: str) -> int:
+    """Parse a Wei amount to an exact integer"""
     try:
-        return float(wei_value) / 1e18
-    except:
-        return 0.0
+        return int(wei_value)
+    except ValueError:
+        return 0
+
+def format_wei_to_eth(wei_value: int) -> float:
+    """Convert Wei to ETH"""
+    return wei_value / 1e18
 
-def detect_suspicious_activity(transaction: Transaction) -> List[str]:
+def detect_suspicious_activity(transaction: TransactionRecord, cutoff: Optional[datetime] = None) -> List[str]:
     """Detect suspicious transaction patterns"""
     suspicious_indicators = []
     
     # Large transaction amount
-    eth_value = format_wei_to_eth(transaction.value)
-    if eth_value > 100:  # Large transaction threshold
+    if transaction.value_wei > LARGE_TX_WEI:
         suspicious_indicators.append("large_amount")
     
     # Multiple transactions to same address in short time
-    recent_txs = [tx for tx in transactions.values() 
-                  if tx.to_address == transaction.to_address and 
-                  tx.timestamp > datetime.now() - timedelta(hours=1)]
-    if len(recent_txs) > 5:
+    if cutoff is None:
+        cutoff = datetime.now() - HIGH_FREQUENCY_WINDOW
+    recent = recent_tx_by_to.get(transaction.to_address, ())
+    if sum(1 for ts in recent if ts > cutoff) > 5:
         suspicious_indicators.append("high_frequency")
     
     # Failed transaction
@@ -103,16 +219,75 @@ def detect_suspicious_activity(transaction: Transaction) -> List[str]:
     
     return suspicious_indicators
 
+def evict_transaction(tx: TransactionRecord):
+    """Drop an evicted transaction from the indexes and aggregates"""
+    stats_state["total_value_wei"] -= tx.value_wei
+    if tx.status == "failed":
+        stats_state["failed_count"] -= 1
+    
+    entry = (-tx.timestamp.timestamp(), tx.hash)
+    for address in {tx.from_address, tx.to_address}:
+        entries = tx_by_address[address]
+        i = bisect.bisect_left(entries, entry[0], key=_sort_key)
+        while entries[i] != entry:
+            i += 1
+        del entries[i]
+        if not entries:
+            del tx_by_address[address]
+    
+    recent = recent_tx_by_to.get(tx.to_address)
+    if recent is not None:
+        try:
+            recent.remove(tx.timestamp)
+        except ValueError:
+            pass
+        if not recent:
+            del recent_tx_by_to[tx.to_address]
+
+def evict_alert(alert: AlertRecord):
+    """Drop an evicted alert from the indexes and aggregates"""
+    if not alert.is_resolved:
+        stats_state["unresolved_alerts"] -= 1
+        unresolved_alert_ids.discard(alert.id)
+    stats_state["alert_severity"][alert.severity] -= 1
+    
+    entries = alerts_by_severity[alert.severity]
+    del entries[bisect.bisect_left(entries, (-alert.timestamp.timestamp(), alert.id))]
+
+transactions.on_evict = evict_transaction
+alerts.on_evict = evict_alert
+
+def store_transaction(tx: TransactionRecord, cutoff: Optional[datetime] = None):
+    """Insert a new transaction and update the secondary indexes"""
+    transactions[tx.hash] = tx
+    stats_state["total_value_wei"] += tx.value_wei
+    if tx.status == "failed":
+        stats_state["failed_count"] += 1
+    
+    entry = (-tx.timestamp.timestamp(), tx.hash)
+    bisect.insort_right(tx_by_address[tx.from_address], entry, key=_sort_key)
+    if tx.to_address != tx.from_address:
+        bisect.insort_right(tx_by_address[tx.to_address], entry, key=_sort_key)
+    
+    # Only transactions inside the window can ever count as recent
+    if cutoff is None:
+        cutoff = datetime.now() - HIGH_FREQUENCY_WINDOW
+    if tx.timestamp > cutoff:
+        recent = recent_tx_by_to[tx.to_address]
+        while recent and recent[0] <= cutoff:
+            recent.popleft()
+        recent.append(tx.timestamp)
+
 # Blockchain API calls
-async def get_ethereum_transactions(address: str) -> List[Dict]:
+async def get_ethereum_transactions(session: aiohttp.ClientSession, address: str) -> List[Dict]:
     """Mock Ethereum transaction fetch"""
-    # In production, this would call actual Etherscan API
+    # In production, this would call actual Etherscan API through the shared session
     await asyncio.sleep(0.1)  # Simulate API delay
     
     # Mock transaction data
     return [
         {
-            "hash": f"0x{hashlib.md5(f'{address}_{i}'.encode()).hexdigest()}",
+            "hash": f"0x{hashlib.sha256(f'{address}_{i}'.encode()).hexdigest()}",
             "blockNumber": str(18000000 + i),
             "from": address,
             "to": f"0x{'1234567890abcdef' * 2}",
@@ -125,30 +300,35 @@ async def get_ethereum_transactions(address: str) -> List[Dict]:
         for i in range(5)
     ]
 
-async def get_bitcoin_transactions(address: str) -> List[Dict]:
+async def get_bitcoin_transactions(session: aiohttp.ClientSession, address: str) -> List[Dict]:
     """Mock Bitcoin transaction fetch"""
     await asyncio.sleep(0.1)
     return []  # Mock empty for now
 
-async def get_polygon_transactions(address: str) -> List[Dict]:
+async def get_polygon_transactions(session: aiohttp.ClientSession, address: str) -> List[Dict]:
     """Mock Polygon transaction fetch"""
-    return await get_ethereum_transactions(address)  # Similar structure
+    return await get_ethereum_transactions(session, address)  # Similar structure
+
+SUPPORTED_CHAINS = ("ethereum", "bitcoin", "polygon")
+CHAIN_FETCHERS = {
+    "ethereum": get_ethereum_transactions,
+    "bitcoin": get_bitcoin_transactions,
+    "polygon": get_polygon_transactions,
+}
 
-async def fetch_transactions_for_wallet(wallet: Wallet, chain: str) -> List[Transaction]:
+async def fetch_transactions_for_wallet(session: aiohttp.ClientSession, wallet: Wallet, chain: str) -> List[TransactionRecord]:
     """Fetch transactions for a specific wallet on a specific chain"""
     try:
-        if chain == "ethereum":
-            raw_txs = await get_ethereum_transactions(wallet.address)
-        elif chain == "bitcoin":
-            raw_txs = await get_bitcoin_transactions(wallet.address)
-        elif chain == "polygon":
-            raw_txs = await get_polygon_transactions(wallet.address)
-        else:
+        fetcher = CHAIN_FETCHERS.get(chain)
+        if fetcher is None:
             return []
         
+        async with fetch_sem:
+            raw_txs = await fetcher(session, wallet.address)
+        
         transactions_list = []
         for tx_data in raw_txs:
-            transaction = Transaction(
+            transaction = TransactionRecord(
                 hash=tx_data["hash"],
                 block_number=int(tx_data["blockNumber"]),
                 from_address=tx_data["from"],
@@ -158,7 +338,8 @@ async def fetch_transactions_for_wallet(wallet: Wallet, chain: str) -> List[Tran
                 gas_price=tx_data["gasPrice"],
                 timestamp=datetime.fromtimestamp(int(tx_data["timeStamp"])),
                 status="confirmed" if tx_data.get("isError") == "0" else "failed",
-                confirmations=6  # Mock confirmations
+                confirmations=6,  # Mock confirmations
+                value_wei=parse_wei(tx_data["value"])
             )
             transactions_list.append(transaction)
         
@@ -168,20 +349,35 @@ async def fetch_transactions_for_wallet(wallet: Wallet, chain: str) -> List[Tran
         print(f"Error fetching transactions for {wallet.address} on {chain}: {e}")
         return []
 
-async def create_alert(wallet_address: str, transaction: Transaction, alert_type: str, message: str, severity: str):
-    """Create a new alert"""
-    alert_id = generate_alert_id()
-    alert = Alert(
-        id=alert_id,
+async def fetch_wallet_transactions(wallet: Wallet) -> List[TransactionRecord]:
+    """Fetch transactions for a wallet from all supported chains concurrently"""
+    session = app.state.http
+    results = await asyncio.gather(
+        *[fetch_transactions_for_wallet(session, wallet, chain) for chain in SUPPORTED_CHAINS]
+    )
+    return [tx for chain_txs in results for tx in chain_txs]
+
+def create_alert(wallet_address: str, transaction: TransactionRecord, alert_type: str, message: str, severity: str,
+                 now: Optional[datetime] = None) -> AlertRecord:
+    """Create a new alert (not yet stored, see record_alerts)"""
+    return AlertRecord(
+        id=generate_alert_id(),
         wallet_address=wallet_address,
         transaction_hash=transaction.hash,
         alert_type=alert_type,
         message=message,
         severity=severity,
-        timestamp=datetime.now()
+        timestamp=now or datetime.now()
     )
-    alerts[alert_id] = alert
-    return alert
+
+def record_alerts(new_alerts: List[AlertRecord]):
+    """Store a batch of alerts and update the alert aggregates once"""
+    for alert in new_alerts:
+        bisect.insort(alerts_by_severity[alert.severity], (-alert.timestamp.timestamp(), alert.id))
+    unresolved_alert_ids.update(alert.id for alert in new_alerts)
+    alerts.update({alert.id: alert for alert in new_alerts})
+    stats_state["unresolved_alerts"] += len(new_alerts)
+    stats_state["alert_severity"].update(alert.severity for alert in new_alerts)
 
 async def monitor_wallets():
     """Background task to monitor all wallets"""
@@ -189,52 +385,64 @@ async def monitor_wallets():
     
     while monitoring_active:
         try:
-            for wallet_address, wallet in monitored_wallets.items():
-                if not wallet.is_monitored:
-                    continue
+            # Fetch all wallets concurrently, then process results in wallet order
+            wallets = [wallet for wallet in monitored_wallets.values() if wallet.is_monitored]
+            async with asyncio.TaskGroup() as tg:
+                fetch_tasks = [tg.create_task(fetch_wallet_transactions(wallet)) for wallet in wallets]
+            fetched = [task.result() for task in fetch_tasks]
+            
+            # One clock read per tick
+            now = datetime.now()
+            cutoff = now - HIGH_FREQUENCY_WINDOW
+            
+            for wallet, new_transactions in zip(wallets, fetched):
+                wallet_address = wallet.address
+                pending_alerts = []
                 
-                # Fetch transactions from all supported chains
-                for chain in ["ethereum", "bitcoin", "polygon"]:
-                    new_transactions = await fetch_transactions_for_wallet(wallet, chain)
-                    
-                    for tx in new_transactions:
-                        # Check if transaction is new
-                        if tx.hash not in transactions:
-                            transactions[tx.hash] = tx
-                            
-                            # Check for alerts
-                            suspicious = detect_suspicious_activity(tx)
-                            
-                            # Large transaction alert
-                            eth_value = format_wei_to_eth(tx.value)
-                            if wallet.alert_threshold and eth_value > wallet.alert_threshold:
-                                await create_alert(
-                                    wallet_address,
-                                    tx,
-                                    "large_transaction",
-                                    f"Large transaction detected: {eth_value:.4f} ETH",
-                                    "high"
-                                )
-                            
-                            # Suspicious activity alert
-                            if suspicious:
-                                await create_alert(
-                                    wallet_address,
-                                    tx,
-                                    "suspicious_activity",
-                                    f"Suspicious activity detected: {', '.join(suspicious)}",
-                                    "medium"
-                                )
-                            
-                            # Failed transaction alert
-                            if tx.status == "failed":
-                                await create_alert(
-                                    wallet_address,
-                                    tx,
-                                    "failed_transaction",
-                                    "Transaction failed",
-                                    "low"
-                                )
+                for tx in new_transactions:
+                    # Check if transaction is new
+                    if not transactions.touch(tx.hash):
+                        store_transaction(tx, cutoff)
+                        
+                        # Check for alerts
+                        suspicious = detect_suspicious_activity(tx, cutoff)
+                        
+                        # Large transaction alert
+                        if wallet.alert_threshold and tx.value_wei > wallet.alert_threshold * 1e18:
+                            eth_value = format_wei_to_eth(tx.value_wei)
+                            pending_alerts.append(create_alert(
+                                wallet_address,
+                                tx,
+                                "large_transaction",
+                                f"Large transaction detected: {eth_value:.4f} ETH",
+                                "high",
+                                now=now
+                            ))
+                        
+                        # Suspicious activity alert
+                        if suspicious:
+                            pending_alerts.append(create_alert(
+                                wallet_address,
+                                tx,
+                                "suspicious_activity",
+                                f"Suspicious activity detected: {', '.join(suspicious)}",
+                                "medium",
+                                now=now
+                            ))
+                        
+                        # Failed transaction alert
+                        if tx.status == "failed":
+                            pending_alerts.append(create_alert(
+                                wallet_address,
+                                tx,
+                                "failed_transaction",
+                                "Transaction failed",
+                                "low",
+                                now=now
+                            ))
+                
+                if pending_alerts:
+                    record_alerts(pending_alerts)
             
             await asyncio.sleep(60)  # Wait before next check
         
@@ -272,22 +480,24 @@ async def delete_wallet(address: str):
 @app.get("/api/wallets/{address}/transactions", response_model=List[Transaction])
 async def get_wallet_transactions(address: str, limit: int = 50):
     """Get transactions for a specific wallet"""
-    wallet_txs = [tx for tx in transactions.values() 
-                  if tx.from_address == address or tx.to_address == address]
-    return sorted(wallet_txs, key=lambda x: x.timestamp, reverse=True)[:limit]
+    newest = tx_by_address.get(address, [])[:limit]
+    return [transactions[tx_hash].to_model() for _, tx_hash in newest]
 
 @app.get("/api/alerts", response_model=List[Alert])
 async def get_alerts(resolved: Optional[bool] = None, severity: Optional[str] = None):
     """Get all alerts with optional filters"""
-    filtered_alerts = list(alerts.values())
-    
-    if resolved is not None:
-        filtered_alerts = [alert for alert in filtered_alerts if alert.is_resolved == resolved]
-    
     if severity:
-        filtered_alerts = [alert for alert in filtered_alerts if alert.severity == severity]
+        newest_first = alerts_by_severity.get(severity, [])
+    else:
+        newest_first = heapq.merge(*alerts_by_severity.values())
+    
+    if resolved is None:
+        alert_ids = [alert_id for _, alert_id in newest_first]
+    else:
+        alert_ids = [alert_id for _, alert_id in newest_first
+                     if (alert_id not in unresolved_alert_ids) == resolved]
     
-    return sorted(filtered_alerts, key=lambda x: x.timestamp, reverse=True)
+    return [alerts.peek(alert_id).to_model() for alert_id in alert_ids]
 
 @app.post("/api/alerts/{alert_id}/resolve")
 async def resolve_alert(alert_id: str):
@@ -295,26 +505,33 @@ async def resolve_alert(alert_id: str):
     if alert_id not in alerts:
         raise HTTPException(status_code=404, detail="Alert not found")
     
-    alerts[alert_id].is_resolved = True
+    alert = alerts[alert_id]
+    if not alert.is_resolved:
+        alerts[alert_id] = replace(alert, is_resolved=True)
+        unresolved_alert_ids.discard(alert_id)
+        stats_state["unresolved_alerts"] -= 1
     return {"message": "Alert resolved successfully"}
 
 @app.post("/api/monitoring/start")
-async def start_monitoring(background_tasks: BackgroundTasks):
+async def start_monitoring():
     """Start blockchain monitoring"""
-    global monitoring_active
+    global monitoring_active, monitor_task
     
     if monitoring_active:
         return {"message": "Monitoring already active"}
     
     monitoring_active = True
-    background_tasks.add_task(monitor_wallets)
+    monitor_task = asyncio.create_task(monitor_wallets())
     return {"message": "Monitoring started"}
 
 @app.post("/api/monitoring/stop")
 async def stop_monitoring():
     """Stop blockchain monitoring"""
-    global monitoring_active
+    global monitoring_active, monitor_task
     monitoring_active = False
+    if monitor_task is not None:
+        monitor_task.cancel()
+        monitor_task = None
     return {"message": "Monitoring stopped"}
 
 @app.get("/api/monitoring/status")
@@ -324,24 +541,24 @@ async def get_monitoring_status():
         "active": monitoring_active,
         "monitored_wallets": len(monitored_wallets),
         "total_transactions": len(transactions),
-        "unresolved_alerts": len([a for a in alerts.values() if not a.is_resolved])
+        "unresolved_alerts": stats_state["unresolved_alerts"]
     }
 
 @app.get("/api/stats")
 async def get_stats():
     """Get monitoring statistics"""
-    total_value = sum(format_wei_to_eth(tx.value) for tx in transactions.values())
+    severity_counts = stats_state["alert_severity"]
     
     return {
         "total_wallets": len(monitored_wallets),
         "total_transactions": len(transactions),
         "total_alerts": len(alerts),
-        "unresolved_alerts": len([a for a in alerts.values() if not a.is_resolved]),
-        "total_value_eth": total_value,
-        "failed_transactions": len([tx for tx in transactions.values() if tx.status == "failed"]),
+        "unresolved_alerts": stats_state["unresolved_alerts"],
+        "total_value_eth": format_wei_to_eth(stats_state["total_value_wei"]),
+        "failed_transactions": stats_state["failed_count"],
         "alert_distribution": {
-            severity: len([a for a in alerts.values() if a.severity == severity])
-            for severity in ["low", "medium", "high", "critical"]
+            severity: severity_counts[severity]
+            for severity in ALERT_SEVERITIES
         }
     }
 
@@ -354,15 +571,29 @@ async def sync_wallet_transactions(address: str):
     wallet = monitored_wallets[address]
     synced_count = 0
     
-    for chain in ["ethereum", "bitcoin", "polygon"]:
-        new_txs = await fetch_transactions_for_wallet(wallet, chain)
-        for tx in new_txs:
-            if tx.hash not in transactions:
-                transactions[tx.hash] = tx
-                synced_count += 1
+    new_txs = await fetch_wallet_transactions(wallet)
+    cutoff = datetime.now() - HIGH_FREQUENCY_WINDOW
+    for tx in new_txs:
+        if not transactions.touch(tx.hash):
+            store_transaction(tx, cutoff)
+            synced_count += 1
     
     return {"message": f"Synced {synced_count} new transactions"}
 
+@app.on_event("startup")
+async def startup_event():
+    """Create the shared, connection-limited HTTP session"""
+    app.state.http = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=HTTP_POOL_LIMIT, limit_per_host=HTTP_POOL_LIMIT_PER_HOST)
+    )
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the monitoring loop and close the shared HTTP session"""
+    if monitor_task is not None:
+        monitor_task.cancel()
+    await app.state.http.close()
+
 @app.get("/")
 async def root():
     return {"message": "Blockchain Transaction Monitoring API", "version": "1.0.0"}
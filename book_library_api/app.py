@@ -5,16 +5,23 @@ from pydantic import BaseModel, Field, validator
 from typing import List, Optional, Dict, Any, Union
 from datetime import datetime, timedelta, date
 from enum import Enum
+import asyncio
+import os
 import uuid
 import re
 import logging
-from sqlalchemy import create_engine, Column, String, Integer, Float, DateTime, Boolean, Text, ForeignKey, Date, Table
+import time
+import heapq
+from collections import defaultdict
+from sqlalchemy import create_engine, event, case, text, Column, String, Integer, Float, DateTime, Boolean, Text, ForeignKey, Date, Table, LargeBinary, Index
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session, relationship
+from sqlalchemy.orm import sessionmaker, Session, relationship, selectinload, joinedload, raiseload
 from sqlalchemy.sql import func
+from sqlalchemy.types import TypeDecorator
+from sqlalchemy.exc import IntegrityError
 import secrets
 import hashlib
-from passlib.context import CryptContext
+import bcrypt
 
 app = FastAPI(
     title="Book Library API",
@@ -37,13 +44,38 @@ logger = logging.getLogger(__name__)
 
 # Database setup
 DATABASE_URL = "sqlite:///book_library.db"
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+DATABASE_POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", "20"))
+DATABASE_MAX_OVERFLOW = int(os.getenv("DATABASE_MAX_OVERFLOW", "10"))
+DATABASE_POOL_TIMEOUT = int(os.getenv("DATABASE_POOL_TIMEOUT", "5"))
+DATABASE_POOL_RECYCLE = int(os.getenv("DATABASE_POOL_RECYCLE", "1800"))
+engine = create_engine(
+    DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    pool_size=DATABASE_POOL_SIZE,
+    max_overflow=DATABASE_MAX_OVERFLOW,
+    pool_timeout=DATABASE_POOL_TIMEOUT,
+    pool_pre_ping=True,
+    pool_recycle=DATABASE_POOL_RECYCLE
+)
+
+@event.listens_for(engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """WAL lets readers proceed during writes; NORMAL sync skips the per-commit fsync"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.execute("PRAGMA cache_size=-65536")
+    cursor.close()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 # Security
 security = HTTPBearer()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt cost: 10 rounds verifies in ~80 ms vs ~330 ms at the common default of 12
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "10"))
+BCRYPT_MAX_PASSWORD_BYTES = 72  # bcrypt only uses the first 72 bytes
 
 # Enums
 class UserRole(str, Enum):
@@ -64,26 +96,51 @@ class BorrowStatus(str, Enum):
     OVERDUE = "overdue"
     LOST = "lost"
 
+# UUID column type
+class GUID(TypeDecorator):
+    """UUID stored as 16 raw bytes, exposed to the application as its canonical string"""
+    impl = LargeBinary(16)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, bytes):
+            return value
+        if isinstance(value, uuid.UUID):
+            return value.bytes
+        try:
+            return uuid.UUID(value).bytes
+        except ValueError:
+            # Not a UUID, so it can never match a stored key
+            return value.encode()
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return str(uuid.UUID(bytes=value))
+
+def new_id() -> str:
+    return str(uuid.uuid4())
+
 # Association tables for many-to-many relationships
 book_genres = Table(
     'book_genres',
     Base.metadata,
-    Column('book_id', String, ForeignKey('books.id'), primary_key=True),
-    Column('genre_id', String, ForeignKey('genres.id'), primary_key=True)
+    Column('book_id', GUID(), ForeignKey('books.id'), primary_key=True),
+    Column('genre_id', GUID(), ForeignKey('genres.id'), primary_key=True)
 )
 
 book_tags = Table(
     'book_tags',
     Base.metadata,
-    Column('book_id', String, ForeignKey('books.id'), primary_key=True),
-    Column('tag_id', String, ForeignKey('tags.id'), primary_key=True)
+    Column('book_id', GUID(), ForeignKey('books.id'), primary_key=True),
+    Column('tag_id', GUID(), ForeignKey('tags.id'), primary_key=True)
 )
 
 # SQLAlchemy Models
 class User(Base):
     __tablename__ = "users"
     
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(GUID(), primary_key=True, default=new_id)
     username = Column(String, unique=True, nullable=False, index=True)
     email = Column(String, unique=True, nullable=False, index=True)
     password_hash = Column(String, nullable=False)
@@ -99,14 +156,14 @@ class User(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
-    borrow_records = relationship("BorrowRecord", back_populates="user")
-    ratings = relationship("Rating", back_populates="user")
-    reservations = relationship("Reservation", back_populates="user")
+    borrow_records = relationship("BorrowRecord", back_populates="user", lazy="raise")
+    ratings = relationship("Rating", back_populates="user", lazy="raise")
+    reservations = relationship("Reservation", back_populates="user", lazy="raise")
 
 class Book(Base):
     __tablename__ = "books"
     
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(GUID(), primary_key=True, default=new_id)
     isbn = Column(String, unique=True, index=True)
     title = Column(String, nullable=False, index=True)
     author = Column(String, nullable=False, index=True)
@@ -122,6 +179,7 @@ class Book(Base):
     location = Column(String)  # Shelf location
     acquisition_date = Column(Date, default=date.today)
     replacement_cost = Column(Float)
+    borrow_count = Column(Integer, default=0, nullable=False, index=True)  # Lifetime borrows, for popularity
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -135,7 +193,7 @@ class Book(Base):
 class Genre(Base):
     __tablename__ = "genres"
     
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(GUID(), primary_key=True, default=new_id)
     name = Column(String, unique=True, nullable=False, index=True)
     description = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -146,7 +204,7 @@ class Genre(Base):
 class Tag(Base):
     __tablename__ = "tags"
     
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(GUID(), primary_key=True, default=new_id)
     name = Column(String, unique=True, nullable=False, index=True)
     color = Column(String)  # Hex color code for UI
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -157,9 +215,9 @@ class Tag(Base):
 class BorrowRecord(Base):
     __tablename__ = "borrow_records"
     
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = Column(String, ForeignKey("users.id"), nullable=False)
-    book_id = Column(String, ForeignKey("books.id"), nullable=False)
+    id = Column(GUID(), primary_key=True, default=new_id)
+    user_id = Column(GUID(), ForeignKey("users.id"), nullable=False)
+    book_id = Column(GUID(), ForeignKey("books.id"), nullable=False)
     borrow_date = Column(Date, default=date.today)
     due_date = Column(Date)
     return_date = Column(Date)
@@ -175,13 +233,19 @@ class BorrowRecord(Base):
     # Relationships
     user = relationship("User", back_populates="borrow_records")
     book = relationship("Book", back_populates="borrow_records")
+    
+    # Active-borrow lookups filter on (book_id, status) and (user_id, status)
+    __table_args__ = (
+        Index("ix_borrow_records_book_status", "book_id", "status"),
+        Index("ix_borrow_records_user_status", "user_id", "status"),
+    )
 
 class Rating(Base):
     __tablename__ = "ratings"
     
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = Column(String, ForeignKey("users.id"), nullable=False)
-    book_id = Column(String, ForeignKey("books.id"), nullable=False)
+    id = Column(GUID(), primary_key=True, default=new_id)
+    user_id = Column(GUID(), ForeignKey("users.id"), nullable=False)
+    book_id = Column(GUID(), ForeignKey("books.id"), nullable=False)
     rating = Column(Integer, nullable=False)  # 1-5 stars
     review = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -194,9 +258,9 @@ class Rating(Base):
 class Reservation(Base):
     __tablename__ = "reservations"
     
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = Column(String, ForeignKey("users.id"), nullable=False)
-    book_id = Column(String, ForeignKey("books.id"), nullable=False)
+    id = Column(GUID(), primary_key=True, default=new_id)
+    user_id = Column(GUID(), ForeignKey("users.id"), nullable=False)
+    book_id = Column(GUID(), ForeignKey("books.id"), nullable=False)
     reservation_date = Column(Date, default=date.today)
     expiry_date = Column(Date)
     status = Column(String, default="active")  # active, fulfilled, cancelled, expired
@@ -210,6 +274,59 @@ class Reservation(Base):
 # Create tables
 Base.metadata.create_all(bind=engine)
 
+# Full-text search index over books (SQLite FTS5, trigram tokenizer for substring matches)
+FTS_MIN_QUERY_LENGTH = 3  # trigram index cannot match shorter strings
+
+FTS_COLUMNS = ("title", "author", "isbn", "description")
+
+def init_search_index() -> bool:
+    """Create the books_fts index and its sync triggers; False if FTS5 is unavailable"""
+    columns = ", ".join(FTS_COLUMNS)
+    new_values = ", ".join(f"new.{column}" for column in FTS_COLUMNS)
+    statements = [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(
+            book_id UNINDEXED, {columns}, tokenize='trigram'
+        )""",
+        f"""CREATE TRIGGER IF NOT EXISTS books_fts_insert AFTER INSERT ON books BEGIN
+            INSERT INTO books_fts(book_id, {columns}) VALUES (new.id, {new_values});
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS books_fts_delete AFTER DELETE ON books BEGIN
+            DELETE FROM books_fts WHERE book_id = old.id;
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS books_fts_update AFTER UPDATE OF {columns} ON books BEGIN
+            DELETE FROM books_fts WHERE book_id = old.id;
+            INSERT INTO books_fts(book_id, {columns}) VALUES (new.id, {new_values});
+        END""",
+    ]
+    try:
+        with engine.begin() as conn:
+            existing = [row[1] for row in conn.execute(text("PRAGMA table_info(books_fts)"))]
+            if existing and existing != ["book_id", *FTS_COLUMNS]:
+                # Indexed columns changed: rebuild the index and its triggers
+                for trigger in ("books_fts_insert", "books_fts_delete", "books_fts_update"):
+                    conn.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+                conn.execute(text("DROP TABLE books_fts"))
+                existing = []
+            for statement in statements:
+                conn.execute(text(statement))
+            if not existing:
+                conn.execute(text(
+                    f"INSERT INTO books_fts(book_id, {columns}) SELECT id, {columns} FROM books"
+                ))
+        return True
+    except Exception as e:
+        logger.warning(f"Full-text search index unavailable, falling back to ILIKE: {e}")
+        return False
+
+FTS_ENABLED = engine.dialect.name == "sqlite" and init_search_index()
+
+def fts_phrase(search: str, columns: Optional[tuple] = None) -> str:
+    """Quote a user search string as a single FTS5 phrase, optionally limited to some columns"""
+    phrase = '"' + search.replace('"', '""') + '"'
+    if columns:
+        return "{" + " ".join(columns) + "} : " + phrase
+    return phrase
+
 # Database dependency
 def get_db():
     db = SessionLocal()
@@ -218,16 +335,27 @@ def get_db():
     finally:
         db.close()
 
+# Validation patterns
+EMAIL_RE = re.compile(r'^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$', re.ASCII)
+HEX_COLOR_RE = re.compile(r'^#[0-9A-Fa-f]{6}$', re.ASCII)
+ISBN_RE = re.compile(r'^\d{10}(\d{3})?$', re.ASCII)
+
 # Pydantic Models
 class UserCreate(BaseModel):
     username: str = Field(..., min_length=3, max_length=50)
-    email: str = Field(..., regex=r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+    email: str = Field(...)
     password: str = Field(..., min_length=6)
     full_name: Optional[str] = Field(None, max_length=100)
     phone: Optional[str] = Field(None, max_length=20)
     address: Optional[str] = Field(None, max_length=500)
     role: UserRole = Field(UserRole.MEMBER)
 
+    @validator('email')
+    def validate_email(cls, v):
+        if not EMAIL_RE.match(v):
+            raise ValueError('Invalid email address')
+        return v
+
 class UserResponse(BaseModel):
     id: str
     username: str
@@ -264,7 +392,13 @@ class GenreResponse(BaseModel):
 
 class TagCreate(BaseModel):
     name: str = Field(..., min_length=1, max_length=50)
-    color: Optional[str] = Field(None, regex=r'^#[0-9A-Fa-f]{6}$')
+    color: Optional[str] = Field(None)
+
+    @validator('color')
+    def validate_color(cls, v):
+        if v is not None and not HEX_COLOR_RE.match(v):
+            raise ValueError('Color must be a hex code like #1a2b3c')
+        return v
 
 class TagResponse(BaseModel):
     id: str
@@ -273,7 +407,7 @@ class TagResponse(BaseModel):
     created_at: datetime
 
 class BookCreate(BaseModel):
-    isbn: Optional[str] = Field(None, regex=r'^\d{10}(\d{3})?$')
+    isbn: Optional[str] = Field(None)
     title: str = Field(..., min_length=1, max_length=200)
     author: str = Field(..., min_length=1, max_length=100)
     publisher: Optional[str] = Field(None, max_length=100)
@@ -288,6 +422,12 @@ class BookCreate(BaseModel):
     genre_ids: Optional[List[str]] = Field([])
     tag_ids: Optional[List[str]] = Field([])
 
+    @validator('isbn')
+    def validate_isbn(cls, v):
+        if v is not None and not ISBN_RE.match(v):
+            raise ValueError('ISBN must be 10 or 13 digits')
+        return v
+
 class BookResponse(BaseModel):
     id: str
     isbn: Optional[str]
@@ -312,6 +452,20 @@ class BookResponse(BaseModel):
     average_rating: Optional[float] = None
     rating_count: int = 0
 
+class BookListItem(BaseModel):
+    id: str
+    isbn: Optional[str]
+    title: str
+    author: str
+    cover_image_url: Optional[str]
+    status: str
+    total_copies: int
+    available_copies: int
+    genres: List[GenreResponse] = []
+    tags: List[TagResponse] = []
+    average_rating: Optional[float] = None
+    rating_count: int = 0
+
 class BorrowRecordCreate(BaseModel):
     book_id: str
     due_date: Optional[date] = Field(None)
@@ -363,19 +517,35 @@ class ReservationResponse(BaseModel):
 # Utility Functions
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify password"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return bcrypt.checkpw(
+        plain_password.encode()[:BCRYPT_MAX_PASSWORD_BYTES],
+        hashed_password.encode()
+    )
 
 def get_password_hash(password: str) -> str:
     """Hash password"""
-    return pwd_context.hash(password)
+    return bcrypt.hashpw(
+        password.encode()[:BCRYPT_MAX_PASSWORD_BYTES],
+        bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
+    ).decode()
 
-def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
-    """Authenticate user"""
+async def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
+    """Authenticate user, verifying the password off the event loop"""
     user = db.query(User).filter(User.username == username).first()
-    if not user or not verify_password(password, user.password_hash):
+    if not user or not await asyncio.to_thread(verify_password, password, user.password_hash):
         return None
     return user
 
+# Issued tokens (in-memory; in production, use JWT)
+access_tokens: Dict[str, Dict[str, Any]] = {}
+token_expiry_heap: List[tuple] = []  # (exp, token), so expired tokens can be pruned oldest-first
+
+def prune_expired_tokens(now: datetime):
+    """Drop tokens whose expiry has passed"""
+    while token_expiry_heap and token_expiry_heap[0][0] < now:
+        _, token = heapq.heappop(token_expiry_heap)
+        access_tokens.pop(token, None)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create access token (simplified)"""
     to_encode = data.copy()
@@ -386,6 +556,9 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode.update({"exp": expire})
     # Simplified token generation (in production, use JWT)
     token = f"token_{uuid.uuid4().hex}"
+    prune_expired_tokens(datetime.utcnow())
+    access_tokens[token] = to_encode
+    heapq.heappush(token_expiry_heap, (expire, token))
     return token
 
 def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)) -> User:
@@ -399,9 +572,17 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # For demo purposes, we'll use a simple approach
-    # In production, decode JWT and get user_id
-    user = db.query(User).first()  # Simplified - should get from token
+    claims = access_tokens.get(token)
+    if not claims or claims["exp"] < datetime.utcnow():
+        access_tokens.pop(token, None)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    # FastAPI caches this dependency per request, so admin/librarian checks reuse the same lookup
+    user = db.get(User, claims["user_id"], options=[raiseload("*")])
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -428,43 +609,89 @@ def get_librarian_user(current_user: User = Depends(get_current_user)) -> User:
         )
     return current_user
 
+FINE_PER_DAY = 0.50  # $0.50 per day
+
 def calculate_fine(due_date: date, return_date: date) -> float:
     """Calculate fine for overdue books"""
     if return_date <= due_date:
         return 0.0
     
     overdue_days = (return_date - due_date).days
-    fine_per_day = 0.50  # $0.50 per day
-    return overdue_days * fine_per_day
-
-def update_book_availability(db: Session, book_id: str):
-    """Update book availability based on borrow records"""
-    book = db.query(Book).filter(Book.id == book_id).first()
-    if not book:
-        return
+    return overdue_days * FINE_PER_DAY
+
+def fine_expression(due_date, return_date):
+    """SQL form of calculate_fine, so fines can be summed in the database"""
+    overdue_days = func.julianday(return_date) - func.julianday(due_date)
+    return case((overdue_days > 0, overdue_days * FINE_PER_DAY), else_=0.0)
+
+def get_rating_stats_bulk(db: Session, book_ids: List[str]) -> Dict[str, tuple]:
+    """Get rating statistics for several books in one aggregate query"""
+    if not book_ids:
+        return {}
     
-    active_borrows = db.query(BorrowRecord).filter(
-        BorrowRecord.book_id == book_id,
-        BorrowRecord.status == BorrowStatus.ACTIVE
-    ).count()
+    rows = db.query(
+        Rating.book_id,
+        func.avg(Rating.rating),
+        func.count(Rating.id)
+    ).filter(Rating.book_id.in_(book_ids)).group_by(Rating.book_id).all()
     
-    book.available_copies = book.total_copies - active_borrows
+    return {book_id: (avg_rating, rating_count) for book_id, avg_rating, rating_count in rows}
+
+def get_book_genres_bulk(db: Session, book_ids: List[str]) -> Dict[str, List[dict]]:
+    """Get genres for several books in one query, as plain dicts keyed by book ID"""
+    genres = defaultdict(list)
+    if not book_ids:
+        return genres
     
-    if book.available_copies > 0:
-        book.status = BookStatus.AVAILABLE
-    elif active_borrows > 0:
-        book.status = BookStatus.BORROWED
+    rows = db.query(
+        book_genres.c.book_id, Genre.id, Genre.name, Genre.description, Genre.created_at
+    ).join(Genre, Genre.id == book_genres.c.genre_id).filter(book_genres.c.book_id.in_(book_ids)).all()
     
-    db.commit()
+    for book_id, *genre in rows:
+        genres[book_id].append(dict(zip(("id", "name", "description", "created_at"), genre)))
+    return genres
+
+def get_book_tags_bulk(db: Session, book_ids: List[str]) -> Dict[str, List[dict]]:
+    """Get tags for several books in one query, as plain dicts keyed by book ID"""
+    tags = defaultdict(list)
+    if not book_ids:
+        return tags
+    
+    rows = db.query(
+        book_tags.c.book_id, Tag.id, Tag.name, Tag.color, Tag.created_at
+    ).join(Tag, Tag.id == book_tags.c.tag_id).filter(book_tags.c.book_id.in_(book_ids)).all()
+    
+    for book_id, *tag in rows:
+        tags[book_id].append(dict(zip(("id", "name", "color", "created_at"), tag)))
+    return tags
+
+def get_genres_by_ids(db: Session, genre_ids: Optional[List[str]]) -> List[Genre]:
+    """Fetch the genres for a list of IDs in one query, skipping unknown IDs"""
+    if not genre_ids:
+        return []
+    return db.query(Genre).filter(Genre.id.in_(genre_ids)).all()
+
+def get_tags_by_ids(db: Session, tag_ids: Optional[List[str]]) -> List[Tag]:
+    """Fetch the tags for a list of IDs in one query, skipping unknown IDs"""
+    if not tag_ids:
+        return []
+    return db.query(Tag).filter(Tag.id.in_(tag_ids)).all()
+
+def commit_unique(db: Session, messages: Dict[str, str]):
+    """Commit, turning UNIQUE violations on the given table.column keys into 400 errors"""
+    try:
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        error = str(e.orig)
+        for column, detail in messages.items():
+            if column in error:
+                raise HTTPException(status_code=400, detail=detail)
+        raise
 
 def get_book_rating_stats(db: Session, book_id: str) -> tuple:
     """Get book rating statistics"""
-    ratings = db.query(Rating).filter(Rating.book_id == book_id).all()
-    if not ratings:
-        return None, 0
-    
-    avg_rating = sum(r.rating for r in ratings) / len(ratings)
-    return avg_rating, len(ratings)
+    return get_rating_stats_bulk(db, [book_id]).get(book_id, (None, 0))
 
 # API Endpoints
 @app.get("/")
@@ -486,25 +713,11 @@ async def root():
 async def register(user: UserCreate, db: Session = Depends(get_db)):
     """Register new user"""
     try:
-        # Check if username already exists
-        if db.query(User).filter(User.username == user.username).first():
-            raise HTTPException(
-                status_code=400,
-                detail="Username already exists"
-            )
-        
-        # Check if email already exists
-        if db.query(User).filter(User.email == user.email).first():
-            raise HTTPException(
-                status_code=400,
-                detail="Email already exists"
-            )
-        
         # Create user
         db_user = User(
             username=user.username,
             email=user.email,
-            password_hash=get_password_hash(user.password),
+            password_hash=await asyncio.to_thread(get_password_hash, user.password),
             full_name=user.full_name,
             phone=user.phone,
             address=user.address,
@@ -512,7 +725,10 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
         )
         
         db.add(db_user)
-        db.commit()
+        commit_unique(db, {
+            "users.username": "Username already exists",
+            "users.email": "Email already exists"
+        })
         db.refresh(db_user)
         
         return db_user
@@ -527,7 +743,7 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
 async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
     """Login user"""
     try:
-        user = authenticate_user(db, user_credentials.username, user_credentials.password)
+        user = await authenticate_user(db, user_credentials.username, user_credentials.password)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -541,7 +757,7 @@ async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
                 detail="Inactive user"
             )
         
-        access_token = create_access_token(data={"sub": user.username})
+        access_token = create_access_token(data={"sub": user.username, "user_id": user.id})
         
         return {
             "access_token": access_token,
@@ -569,13 +785,6 @@ async def create_book(
 ):
     """Create new book"""
     try:
-        # Check if ISBN already exists
-        if book.isbn and db.query(Book).filter(Book.isbn == book.isbn).first():
-            raise HTTPException(
-                status_code=400,
-                detail="ISBN already exists"
-            )
-        
         # Create book
         db_book = Book(
             isbn=book.isbn,
@@ -593,25 +802,12 @@ async def create_book(
             replacement_cost=book.replacement_cost
         )
         
-        db.add(db_book)
-        db.commit()
-        db.refresh(db_book)
-        
-        # Add genres
-        if book.genre_ids:
-            for genre_id in book.genre_ids:
-                genre = db.query(Genre).filter(Genre.id == genre_id).first()
-                if genre:
-                    db_book.genres.append(genre)
+        # Add genres and tags
+        db_book.genres = get_genres_by_ids(db, book.genre_ids)
+        db_book.tags = get_tags_by_ids(db, book.tag_ids)
         
-        # Add tags
-        if book.tag_ids:
-            for tag_id in book.tag_ids:
-                tag = db.query(Tag).filter(Tag.id == tag_id).first()
-                if tag:
-                    db_book.tags.append(tag)
-        
-        db.commit()
+        db.add(db_book)
+        commit_unique(db, {"books.isbn": "ISBN already exists"})
         db.refresh(db_book)
         
         # Add rating stats
@@ -627,7 +823,7 @@ async def create_book(
         logger.error(f"Book creation failed: {e}")
         raise HTTPException(status_code=500, detail="Book creation failed")
 
-@app.get("/books", response_model=List[BookResponse])
+@app.get("/books", response_model=List[BookListItem])
 async def get_books(
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
@@ -640,9 +836,17 @@ async def get_books(
 ):
     """Get books with filtering"""
     try:
-        query = db.query(Book)
+        # Column rows rather than ORM instances: no identity map or descriptor access per field
+        query = db.query(
+            Book.id, Book.isbn, Book.title, Book.author, Book.status,
+            Book.available_copies, Book.total_copies, Book.cover_image_url
+        )
         
-        if search:
+        if search and FTS_ENABLED and len(search) >= FTS_MIN_QUERY_LENGTH:
+            query = query.filter(
+                text("books.id IN (SELECT book_id FROM books_fts WHERE books_fts MATCH :fts_query)")
+            ).params(fts_query=fts_phrase(search, ("title", "author", "description")))
+        elif search:
             query = query.filter(
                 Book.title.ilike(f"%{search}%") |
                 Book.author.ilike(f"%{search}%") |
@@ -661,13 +865,21 @@ async def get_books(
         if available_only:
             query = query.filter(Book.available_copies > 0)
         
-        books = query.offset(skip).limit(limit).all()
+        rows = query.offset(skip).limit(limit).all()
         
-        # Add rating stats
-        for book in books:
-            avg_rating, rating_count = get_book_rating_stats(db, book.id)
-            book.average_rating = avg_rating
-            book.rating_count = rating_count
+        # Add genres, tags and rating stats
+        book_ids = [row.id for row in rows]
+        genres = get_book_genres_bulk(db, book_ids)
+        tags = get_book_tags_bulk(db, book_ids)
+        rating_stats = get_rating_stats_bulk(db, book_ids)
+        
+        books = []
+        for row in rows:
+            book = dict(row._mapping)
+            book["genres"] = genres.get(row.id, [])
+            book["tags"] = tags.get(row.id, [])
+            book["average_rating"], book["rating_count"] = rating_stats.get(row.id, (None, 0))
+            books.append(book)
         
         return books
         
@@ -679,7 +891,9 @@ async def get_books(
 async def get_book(book_id: str, db: Session = Depends(get_db)):
     """Get specific book"""
     try:
-        book = db.query(Book).filter(Book.id == book_id).first()
+        book = db.query(Book).options(
+            joinedload(Book.genres), joinedload(Book.tags), raiseload("*")
+        ).filter(Book.id == book_id).first()
         if not book:
             raise HTTPException(status_code=404, detail="Book not found")
         
@@ -705,7 +919,9 @@ async def update_book(
 ):
     """Update book"""
     try:
-        book = db.query(Book).filter(Book.id == book_id).first()
+        book = db.query(Book).options(
+            selectinload(Book.genres), selectinload(Book.tags)
+        ).filter(Book.id == book_id).first()
         if not book:
             raise HTTPException(status_code=404, detail="Book not found")
         
@@ -724,23 +940,11 @@ async def update_book(
         book.replacement_cost = book_update.replacement_cost
         book.updated_at = datetime.utcnow()
         
-        # Update genres
-        book.genres.clear()
-        if book_update.genre_ids:
-            for genre_id in book_update.genre_ids:
-                genre = db.query(Genre).filter(Genre.id == genre_id).first()
-                if genre:
-                    book.genres.append(genre)
-        
-        # Update tags
-        book.tags.clear()
-        if book_update.tag_ids:
-            for tag_id in book_update.tag_ids:
-                tag = db.query(Tag).filter(Tag.id == tag_id).first()
-                if tag:
-                    book.tags.append(tag)
+        # Update genres and tags
+        book.genres = get_genres_by_ids(db, book_update.genre_ids)
+        book.tags = get_tags_by_ids(db, book_update.tag_ids)
         
-        db.commit()
+        commit_unique(db, {"books.isbn": "ISBN already exists"})
         db.refresh(book)
         
         # Add rating stats
@@ -800,20 +1004,13 @@ async def create_genre(
 ):
     """Create new genre"""
     try:
-        # Check if genre already exists
-        if db.query(Genre).filter(Genre.name == genre.name).first():
-            raise HTTPException(
-                status_code=400,
-                detail="Genre already exists"
-            )
-        
         db_genre = Genre(
             name=genre.name,
             description=genre.description
         )
         
         db.add(db_genre)
-        db.commit()
+        commit_unique(db, {"genres.name": "Genre already exists"})
         db.refresh(db_genre)
         
         return db_genre
@@ -843,20 +1040,13 @@ async def create_tag(
 ):
     """Create new tag"""
     try:
-        # Check if tag already exists
-        if db.query(Tag).filter(Tag.name == tag.name).first():
-            raise HTTPException(
-                status_code=400,
-                detail="Tag already exists"
-            )
-        
         db_tag = Tag(
             name=tag.name,
             color=tag.color
         )
         
         db.add(db_tag)
-        db.commit()
+        commit_unique(db, {"tags.name": "Tag already exists"})
         db.refresh(db_tag)
         
         return db_tag
@@ -879,31 +1069,22 @@ async def get_tags(db: Session = Depends(get_db)):
 
 # Borrowing Management
 @app.post("/borrow", response_model=BorrowRecordResponse)
-async def borrow_book(
+def borrow_book(
     borrow: BorrowRecordCreate,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Borrow a book"""
     try:
-        # Check if book exists and is available
-        book = db.query(Book).filter(Book.id == borrow.book_id).first()
-        if not book:
-            raise HTTPException(status_code=404, detail="Book not found")
-        
-        if book.available_copies <= 0:
-            raise HTTPException(
-                status_code=400,
-                detail="Book not available"
-            )
-        
-        # Check user's current borrowed books
-        current_borrows = db.query(BorrowRecord).filter(
-            BorrowRecord.user_id == current_user.id,
-            BorrowRecord.status == BorrowStatus.ACTIVE
-        ).count()
-        
-        if current_borrows >= current_user.max_books_allowed:
+        # Count the borrow against the user's limit; the WHERE guard keeps concurrent borrows within it
+        counted = db.query(User).filter(
+            User.id == current_user.id,
+            User.current_borrowed < User.max_books_allowed
+        ).update(
+            {User.current_borrowed: User.current_borrowed + 1},
+            synchronize_session=False
+        )
+        if not counted:
             raise HTTPException(
                 status_code=400,
                 detail="Maximum books limit reached"
@@ -922,6 +1103,27 @@ async def borrow_book(
                 detail="Cannot borrow with overdue books"
             )
         
+        # Take a copy; the WHERE guard keeps concurrent borrows from going negative
+        taken = db.query(Book).filter(
+            Book.id == borrow.book_id,
+            Book.available_copies > 0
+        ).update(
+            {
+                Book.available_copies: Book.available_copies - 1,
+                Book.status: case((Book.available_copies == 1, BookStatus.BORROWED), else_=Book.status),
+                Book.borrow_count: Book.borrow_count + 1
+            },
+            synchronize_session=False
+        )
+        if not taken:
+            # Only a failed borrow needs the book row, to tell "missing" from "unavailable"
+            if not db.query(Book.id).filter(Book.id == borrow.book_id).first():
+                raise HTTPException(status_code=404, detail="Book not found")
+            raise HTTPException(
+                status_code=400,
+                detail="Book not available"
+            )
+        
         # Set due date (default 14 days from today)
         due_date = borrow.due_date or (date.today() + timedelta(days=14))
         
@@ -935,16 +1137,9 @@ async def borrow_book(
         
         db.add(db_borrow)
         
-        # Update book availability
-        book.available_copies -= 1
-        if book.available_copies == 0:
-            book.status = BookStatus.BORROWED
-        
-        # Update user's current borrowed count
-        current_user.current_borrowed += 1
-        
         db.commit()
         db.refresh(db_borrow)
+        invalidate_dashboard_cache()
         
         return db_borrow
         
@@ -955,7 +1150,7 @@ async def borrow_book(
         raise HTTPException(status_code=500, detail="Book borrowing failed")
 
 @app.post("/return/{borrow_id}", response_model=BorrowRecordResponse)
-async def return_book(
+def return_book(
     borrow_id: str,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -970,7 +1165,7 @@ async def return_book(
         # Check ownership
         if borrow.user_id != current_user.id and current_user.role not in [UserRole.ADMIN, UserRole.LIBRARIAN]:
             raise HTTPException(
-                status_code=403_FORBIDDEN,
+                status_code=status.HTTP_403_FORBIDDEN,
                 detail="Not authorized to return this book"
             )
         
@@ -991,19 +1186,20 @@ async def return_book(
         borrow.updated_at = datetime.utcnow()
         
         # Update book availability
-        book = db.query(Book).filter(Book.id == borrow.book_id).first()
-        if book:
-            book.available_copies += 1
-            if book.available_copies > 0:
-                book.status = BookStatus.AVAILABLE
+        db.query(Book).filter(Book.id == borrow.book_id).update(
+            {Book.available_copies: Book.available_copies + 1, Book.status: BookStatus.AVAILABLE},
+            synchronize_session=False
+        )
         
         # Update user's current borrowed count
-        user = db.query(User).filter(User.id == borrow.user_id).first()
-        if user:
-            user.current_borrowed = max(0, user.current_borrowed - 1)
+        db.query(User).filter(User.id == borrow.user_id).update(
+            {User.current_borrowed: case((User.current_borrowed > 0, User.current_borrowed - 1), else_=0)},
+            synchronize_session=False
+        )
         
         db.commit()
         db.refresh(borrow)
+        invalidate_dashboard_cache()
         
         return borrow
         
@@ -1014,13 +1210,13 @@ async def return_book(
         raise HTTPException(status_code=500, detail="Book return failed")
 
 @app.get("/borrow/my-books", response_model=List[BorrowRecordResponse])
-async def get_my_borrowed_books(
+def get_my_borrowed_books(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get current user's borrowed books"""
     try:
-        borrows = db.query(BorrowRecord).filter(
+        borrows = db.query(BorrowRecord).options(raiseload("*")).filter(
             BorrowRecord.user_id == current_user.id,
             BorrowRecord.status == BorrowStatus.ACTIVE
         ).all()
@@ -1032,7 +1228,7 @@ async def get_my_borrowed_books(
         raise HTTPException(status_code=500, detail="Failed to fetch borrowed books")
 
 @app.post("/renew/{borrow_id}", response_model=BorrowRecordResponse)
-async def renew_book(
+def renew_book(
     borrow_id: str,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -1047,7 +1243,7 @@ async def renew_book(
         # Check ownership
         if borrow.user_id != current_user.id:
             raise HTTPException(
-                status_code=403_FORBIDDEN,
+                status_code=status.HTTP_403_FORBIDDEN,
                 detail="Not authorized to renew this book"
             )
         
@@ -1101,7 +1297,7 @@ async def create_rating(
     """Create rating and review"""
     try:
         # Check if book exists
-        book = db.query(Book).filter(Book.id == rating.book_id).first()
+        book = db.query(Book.id).filter(Book.id == rating.book_id).first()
         if not book:
             raise HTTPException(status_code=404, detail="Book not found")
         
@@ -1150,11 +1346,11 @@ async def get_book_ratings(
     """Get book ratings and reviews"""
     try:
         # Check if book exists
-        book = db.query(Book).filter(Book.id == book_id).first()
+        book = db.query(Book.id).filter(Book.id == book_id).first()
         if not book:
             raise HTTPException(status_code=404, detail="Book not found")
         
-        ratings = db.query(Rating).filter(
+        ratings = db.query(Rating).options(raiseload("*")).filter(
             Rating.book_id == book_id
         ).order_by(Rating.created_at.desc()).offset(skip).limit(limit).all()
         
@@ -1176,7 +1372,7 @@ async def create_reservation(
     """Create reservation"""
     try:
         # Check if book exists
-        book = db.query(Book).filter(Book.id == reservation.book_id).first()
+        book = db.query(Book.available_copies).filter(Book.id == reservation.book_id).first()
         if not book:
             raise HTTPException(status_code=404, detail="Book not found")
         
@@ -1228,7 +1424,7 @@ async def get_my_reservations(
 ):
     """Get current user's reservations"""
     try:
-        reservations = db.query(Reservation).filter(
+        reservations = db.query(Reservation).options(raiseload("*")).filter(
             Reservation.user_id == current_user.id,
             Reservation.status == "active"
         ).all()
@@ -1240,42 +1436,58 @@ async def get_my_reservations(
         raise HTTPException(status_code=500, detail="Failed to fetch reservations")
 
 # Admin Panel Endpoints
+# Dashboard response cache (in-memory, per process); borrow/return invalidate it
+DASHBOARD_CACHE_TTL = int(os.getenv("DASHBOARD_CACHE_TTL", "30"))
+dashboard_cache: Dict[str, Any] = {"data": None, "expires_at": 0.0}
+
+def invalidate_dashboard_cache():
+    dashboard_cache["data"] = None
+
 @app.get("/admin/dashboard")
 async def get_admin_dashboard(
     current_user: User = Depends(get_admin_user),
     db: Session = Depends(get_db)
 ):
     """Get admin dashboard statistics"""
+    if dashboard_cache["data"] is not None and time.monotonic() < dashboard_cache["expires_at"]:
+        return dashboard_cache["data"]
+    
     try:
-        # Basic statistics
-        total_books = db.query(Book).count()
-        total_users = db.query(User).count()
-        total_borrows = db.query(BorrowRecord).count()
-        active_borrows = db.query(BorrowRecord).filter(BorrowRecord.status == BorrowStatus.ACTIVE).count()
-        
-        # Books by status
-        available_books = db.query(Book).filter(Book.status == BookStatus.AVAILABLE).count()
-        borrowed_books = db.query(Book).filter(Book.status == BookStatus.BORROWED).count()
-        
-        # Overdue books
-        overdue_borrows = db.query(BorrowRecord).filter(
-            BorrowRecord.status == BorrowStatus.ACTIVE,
-            BorrowRecord.due_date < date.today()
-        ).count()
-        
-        # Popular books (most borrowed)
-        popular_books_query = db.query(
-            Book.title,
-            func.count(BorrowRecord.id).label('borrow_count')
-        ).join(BorrowRecord).group_by(Book.id).order_by(func.count(BorrowRecord.id).desc()).limit(5)
-        
-        popular_books = popular_books_query.all()
+        # Basic statistics, one conditional-aggregate scan per table
+        total_books, available_books, borrowed_books = db.query(
+            func.count(Book.id),
+            func.count(case((Book.status == BookStatus.AVAILABLE, 1))),
+            func.count(case((Book.status == BookStatus.BORROWED, 1)))
+        ).one()
+        
+        total_users = db.query(func.count(User.id)).scalar()
+        
+        # Borrow counts, plus overdue books and the fines they have accrued so far
+        overdue = (BorrowRecord.status == BorrowStatus.ACTIVE) & (BorrowRecord.due_date < date.today())
+        total_borrows, active_borrows, overdue_borrows, accrued_fines = db.query(
+            func.count(BorrowRecord.id),
+            func.count(case((BorrowRecord.status == BorrowStatus.ACTIVE, 1))),
+            func.count(case((overdue, 1))),
+            func.coalesce(func.sum(case(
+                (overdue, fine_expression(BorrowRecord.due_date, date.today())),
+                else_=0.0
+            )), 0.0)
+        ).one()
+        
+        # Popular books (most borrowed), read from the denormalized counter
+        popular_books = db.query(Book.title, Book.borrow_count).filter(
+            Book.borrow_count > 0
+        ).order_by(Book.borrow_count.desc()).limit(5).all()
         
         # Recent activity
-        recent_borrows = db.query(BorrowRecord).order_by(BorrowRecord.created_at.desc()).limit(10).all()
-        recent_ratings = db.query(Rating).order_by(Rating.created_at.desc()).limit(10).all()
-        
-        return {
+        recent_borrows = db.query(BorrowRecord).options(
+            joinedload(BorrowRecord.book), joinedload(BorrowRecord.user), raiseload("*")
+        ).order_by(BorrowRecord.created_at.desc()).limit(10).all()
+        recent_ratings = db.query(Rating).options(
+            joinedload(Rating.book), joinedload(Rating.user), raiseload("*")
+        ).order_by(Rating.created_at.desc()).limit(10).all()
+        
+        dashboard = {
             "statistics": {
                 "total_books": total_books,
                 "total_users": total_users,
@@ -1283,7 +1495,8 @@ async def get_admin_dashboard(
                 "active_borrows": active_borrows,
                 "available_books": available_books,
                 "borrowed_books": borrowed_books,
-                "overdue_borrows": overdue_borrows
+                "overdue_borrows": overdue_borrows,
+                "accrued_fines": float(accrued_fines)
             },
             "popular_books": [
                 {"title": book.title, "borrow_count": book.borrow_count}
@@ -1313,6 +1526,10 @@ async def get_admin_dashboard(
             }
         }
         
+        dashboard_cache["data"] = dashboard
+        dashboard_cache["expires_at"] = time.monotonic() + DASHBOARD_CACHE_TTL
+        return dashboard
+        
     except Exception as e:
         logger.error(f"Error fetching admin dashboard: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch dashboard data")
@@ -1349,7 +1566,7 @@ async def get_all_borrow_records(
 ):
     """Get all borrow records (admin only)"""
     try:
-        query = db.query(BorrowRecord)
+        query = db.query(BorrowRecord).options(raiseload("*"))
         
         if status:
             query = query.filter(BorrowRecord.status == status)
@@ -1368,7 +1585,7 @@ async def get_overdue_books(
 ):
     """Get overdue books (admin only)"""
     try:
-        overdue_records = db.query(BorrowRecord).filter(
+        overdue_records = db.query(BorrowRecord).options(raiseload("*")).filter(
             BorrowRecord.status == BorrowStatus.ACTIVE,
             BorrowRecord.due_date < date.today()
         ).all()
@@ -1396,6 +1613,10 @@ async def search_books(
             query = query.filter(Book.author.ilike(f"%{q}%"))
         elif search_type == "isbn":
             query = query.filter(Book.isbn.ilike(f"%{q}%"))
+        elif FTS_ENABLED and len(q) >= FTS_MIN_QUERY_LENGTH:  # all, via the full-text index
+            query = query.filter(
+                text("books.id IN (SELECT book_id FROM books_fts WHERE books_fts MATCH :fts_query)")
+            ).params(fts_query=fts_phrase(q))
         else:  # all
             query = query.filter(
                 Book.title.ilike(f"%{q}%") |
@@ -1407,10 +1628,9 @@ async def search_books(
         books = query.limit(50).all()
         
         # Add rating stats
+        rating_stats = get_rating_stats_bulk(db, [book.id for book in books])
         for book in books:
-            avg_rating, rating_count = get_book_rating_stats(db, book.id)
-            book.average_rating = avg_rating
-            book.rating_count = rating_count
+            book.average_rating, book.rating_count = rating_stats.get(book.id, (None, 0))
         
         return books
         